@@ -0,0 +1,195 @@
+'''
+Render config files to figures without the GUI.
+
+    python batch_render.py "reports/*.json" --format svg --output-dir out
+
+Configs which point at the same data directory are rendered by the same
+worker, so their CSV files are parsed once. With CSVIEWER_RENDER_CACHE_DIR
+set, figures whose config and data did not change are copied from the
+render cache instead of being drawn again.
+'''
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+
+import plotting
+import render_cache
+from data_cache import make_key
+
+
+FORMATS = ('png', 'svg', 'pdf')
+
+RenderTask = Tuple[str, str]
+RenderResult = Tuple[str, str, float, str]
+
+
+def load_config(config_path: str) -> plotting.Config:
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+
+def find_configs(patterns: Sequence[str]) -> List[str]:
+    config_paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        config_paths.extend(matches)
+    return list(dict.fromkeys(config_paths))
+
+
+def get_render_key(
+        config: plotting.Config, data_pool: Sequence, fmt: str,
+        dpi: int = None) -> str:
+
+    if config['data'].get('mode') == 'overview':
+        # the data is streamed from the files; their identity stands for it
+        series = []
+        view = {'dpi': dpi, 'files': [
+            make_key(str(path), {})
+            for path in plotting.get_csv_paths(config)
+        ]}
+    else:
+        series = plotting.get_plotted_series(
+            data_pool, config['data']['fieldnames']
+        )
+        view = {'dpi': dpi}
+    return render_cache.make_key(config, series, fmt, view)
+
+
+def render_figure(
+        config: plotting.Config, data_pool: Sequence, output_path: str,
+        dpi: int = None):
+
+    fmt = Path(output_path).suffix.lstrip('.') or 'png'
+    key = get_render_key(config, data_pool, fmt, dpi)
+    data = render_cache.render_cache.get(key, fmt)
+    if data is None:
+        buffer = BytesIO()
+        build_figure(config, data_pool).savefig(buffer, format=fmt, dpi=dpi)
+        data = buffer.getvalue()
+        render_cache.render_cache.put(key, fmt, data)
+    with open(output_path, 'wb') as f:
+        f.write(data)
+
+
+def build_figure(config: plotting.Config, data_pool: Sequence) -> Figure:
+    fig = Figure(figsize=config['figure']['size'], tight_layout=True)
+    ax = fig.add_subplot()
+    plot_function = plotting.get_plot_function(config, ax)
+    if config['data'].get('mode') == 'overview':
+        plotting.plot_overview(config, ax, plot_function)
+        plotting.set_axes(config, ax)
+    else:
+        viewport_lines = plotting.plot_data(config, data_pool, plot_function)
+        plotting.set_axes(config, ax)
+        plotting.connect_viewport(ax, viewport_lines)
+    return fig
+
+
+def render_batch(tasks: Sequence[RenderTask], dpi: int = None) -> List[RenderResult]:
+    results = []
+    data_pool = None
+    for config_path, output_path in tasks:
+        start = time.perf_counter()
+        error = ''
+        try:
+            config = load_config(config_path)
+            is_overview = config['data'].get('mode') == 'overview'
+            if data_pool is None and not is_overview:
+                data_pool = plotting.get_data_pool(config)
+            render_figure(config, data_pool, output_path, dpi)
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        seconds = time.perf_counter() - start
+        results.append((config_path, output_path, seconds, error))
+    return results
+
+
+def make_batches(
+        tasks: Sequence[RenderTask], workers: int) -> List[List[RenderTask]]:
+    '''
+    Group tasks by data directory and import options, then split the
+    groups until every worker has something to do. Tasks whose config
+    cannot be read go to a batch of their own, which reports them as
+    failed.
+    '''
+    groups: Dict[Tuple[str, str, bool], List[RenderTask]] = {}
+    invalid: List[RenderTask] = []
+    for config_path, output_path in tasks:
+        try:
+            data = load_config(config_path)['data']
+            key = (
+                os.path.abspath(data['directory']),
+                data.get('mode', 'memory'),
+                data.get('compact', False)
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            invalid.append((config_path, output_path))
+            continue
+        groups.setdefault(key, []).append((config_path, output_path))
+
+    batches = list(groups.values())
+    while batches and len(batches) < workers:
+        largest = max(batches, key=len)
+        if len(largest) < 2:
+            break
+        batches.remove(largest)
+        half = len(largest) // 2
+        batches.extend([largest[:half], largest[half:]])
+    if invalid:
+        batches.append(invalid)
+    return batches
+
+
+def main(argv: Sequence[str] = None) -> int:
+    '''
+    Render the configs and return the exit status: 1 if any figure
+    failed, otherwise 0.
+    '''
+    parser = argparse.ArgumentParser(
+        description='Render CSViewer config files to figures.'
+    )
+    parser.add_argument('configs', nargs='+', help='config files or globs')
+    parser.add_argument('--format', choices=FORMATS, default='png')
+    parser.add_argument('--output-dir', default=None)
+    parser.add_argument('--dpi', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    tasks = []
+    for config_path in find_configs(args.configs):
+        output_dir = Path(args.output_dir or Path(config_path).parent)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_path = output_dir.joinpath(f'{Path(config_path).stem}.{args.format}')
+        tasks.append((config_path, str(output_path)))
+
+    start = time.perf_counter()
+    batches = make_batches(tasks, args.workers)
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [
+            executor.submit(render_batch, batch, args.dpi) for batch in batches
+        ]
+        for future in as_completed(futures):
+            for config_path, output_path, seconds, error in future.result():
+                target = f'failed ({error})' if error else output_path
+                failed += bool(error)
+                print(f'{seconds:8.3f} s  {config_path} -> {target}')
+    print(f'{len(tasks)} figures in {time.perf_counter() - start:.3f} s')
+    if failed:
+        print(f'{failed} failed')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,9 @@
+'''
+Headless benchmarks for CSViewer. Run from the `src` folder:
+
+    python -m benchmarks --rows 1e3 1e5 --columns 2 20 --output run.json
+    python -m benchmarks --compare run.json --threshold 0.2
+
+Start-up is timed in a fresh interpreter first; the run fails when it takes
+longer than --startup-target seconds.
+'''
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+TIME_STEP = 0.02
+CHUNK_ROWS = 100_000
+FLOAT_FORMAT = '%.7e'
+
+
+def get_columns(columns: int):
+    names = ['TIME(SEC)']
+    names.extend(f'ACCELERATION-{idx}(G)' for idx in range(1, columns))
+    return names
+
+
+def generate_chunk(
+        start: int, rows: int, columns: int,
+        rng: np.random.Generator) -> pd.DataFrame:
+
+    time = (start + np.arange(rows)) * TIME_STEP
+    data = {'TIME(SEC)': time}
+    for idx, name in enumerate(get_columns(columns)[1:]):
+        period = 0.5 + idx % 7
+        amplitude = 0.3 * np.exp(-time / 30.0)
+        noise = rng.normal(scale=0.01, size=rows)
+        data[name] = amplitude * np.sin(2 * np.pi * time / period) + noise
+    return pd.DataFrame(data)
+
+
+def generate_csv(
+        path: Path, rows: int, columns: int = 2,
+        header: bool = True, seed: int = 0) -> Path:
+    '''
+    Write a ground-acceleration-like CSV shaped like the El Centro samples:
+    a time column followed by `columns - 1` acceleration columns, in the
+    same scientific notation. Rows are written in chunks, so the memory
+    needed does not grow with `rows`.
+    '''
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    with open(path, 'w', newline='') as f:
+        for start in range(0, rows, CHUNK_ROWS):
+            chunk = generate_chunk(
+                start, min(CHUNK_ROWS, rows - start), columns, rng
+            )
+            chunk.to_csv(
+                f, index=False, header=header and start == 0,
+                float_format=FLOAT_FORMAT
+            )
+    return path
@@ -0,0 +1,274 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, List, Sequence, Tuple, TypedDict
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+import pandas as pd
+
+import csv_reader
+import importer
+import plotting
+from benchmarks.generate import generate_csv
+from data_cache import data_cache
+
+
+MIN_REGRESSION_SECONDS = 0.005
+STARTUP_TARGET_SECONDS = 1.0
+
+# Run in a fresh interpreter, since a warm one has the modules cached.
+STARTUP_SCRIPT = '''
+import json
+import sys
+import time
+
+start = time.perf_counter()
+import main_gui
+times = {'import': time.perf_counter() - start}
+eager = [name for name in ('pandas', 'matplotlib') if name in sys.modules]
+try:
+    app = main_gui.App()
+except Exception:
+    app = None
+if app is not None:
+    def on_map(event):
+        times.setdefault('window', time.perf_counter() - start)
+
+    app.root.bind('<Map>', on_map)
+    while not app.is_ready:
+        app.root.update()
+    times['ready'] = time.perf_counter() - start
+    app.root.destroy()
+print(json.dumps({'times': times, 'eager': eager}))
+'''
+
+
+class StageResult(TypedDict):
+    case: str
+    stage: str
+    wall: float
+    peak_bytes: int
+
+
+Stage = Tuple[str, Callable[[], object]]
+
+
+def measure(
+        func: Callable[[], object], repeat: int = 1,
+        trace_memory: bool = True) -> Tuple[float, int]:
+    '''
+    Best wall time over `repeat` untraced runs, then the peak allocation of
+    one traced run. Tracing is kept out of the timed runs because it slows
+    Python-level allocations down.
+    '''
+    walls = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        walls.append(time.perf_counter() - start)
+    peak = 0
+    if trace_memory:
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return min(walls), peak
+
+
+def make_plot_config(columns: Sequence[str]) -> plotting.Config:
+    config = plotting.get_initial_configuration()
+    config['data']['fieldnames'] = [{'x': columns[0], 'y': columns[1]}]
+    config['data']['labels'] = [columns[1]]
+    config['figure'].update({
+        'size': [4.8, 2.4],
+        'point_budget': 4000,
+        'decimation': 'minmax',
+    })
+    config['axis_x'].update({'scale': 'linear', 'lim': None})
+    config['axis_y'].update({'scale': 'linear', 'lim': None})
+    return config
+
+
+def run_import_job(path: str) -> pd.DataFrame:
+    job = importer.ImportJob({'1': path})
+    return job.futures['1'].result()
+
+
+def plot_figure(config: plotting.Config, df: pd.DataFrame) -> Figure:
+    fig = Figure(figsize=config['figure']['size'], tight_layout=True)
+    ax = fig.add_subplot()
+    plot_function = plotting.get_plot_function(config, ax)
+    viewport_lines = plotting.plot_data(config, [df], plot_function)
+    plotting.set_axes(config, ax)
+    plotting.connect_viewport(ax, viewport_lines)
+    return fig
+
+
+def get_treeview_stage(df: pd.DataFrame) -> Callable[[], object]:
+    '''
+    Treeview stage, or None when no display is available.
+    '''
+    import tkinter as tk
+    from custom_widgets import VirtualTreeview
+
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    root.withdraw()
+
+    def present():
+        frame = tk.Frame(root)
+        treeview = VirtualTreeview(frame, list(df.columns), 28)
+        treeview.set_dataframe(df)
+        treeview.adjust_column_width()
+        root.update_idletasks()
+        frame.destroy()
+
+    return present
+
+
+def get_stages(path: str) -> List[Stage]:
+    schema = csv_reader.sniff_schema(csv_reader.read_prefix(path))
+    df = csv_reader.read_csv(path, schema, use_cache=False)
+    config = make_plot_config(list(df.columns))
+    fig = plot_figure(config, df)
+    stages: List[Stage] = [
+        ('sniff', lambda: csv_reader.sniff_schema(csv_reader.read_prefix(path))),
+        ('read_csv', lambda: csv_reader.read_csv(path, schema, use_cache=False)),
+        ('import_job', lambda: run_import_job(path)),
+        ('plot_data', lambda: plot_figure(config, df)),
+        ('savefig', lambda: fig.savefig(BytesIO(), format='png')),
+    ]
+    present = get_treeview_stage(df)
+    if present is not None:
+        stages.insert(3, ('treeview', present))
+    return stages
+
+
+def run(
+        rows_list: Sequence[int], columns_list: Sequence[int],
+        headers: Sequence[bool], data_dir: Path,
+        repeat: int = 1, trace_memory: bool = True) -> List[StageResult]:
+
+    results: List[StageResult] = []
+    for rows in rows_list:
+        for columns in columns_list:
+            for header in headers:
+                case = f'rows={rows} columns={columns} header={header}'
+                path = data_dir.joinpath(f'bench_{rows}_{columns}_{int(header)}.csv')
+                if not path.exists():
+                    generate_csv(path, rows, columns, header)
+                for stage, func in get_stages(str(path)):
+                    wall, peak = measure(func, repeat, trace_memory)
+                    results.append({
+                        'case': case, 'stage': stage,
+                        'wall': wall, 'peak_bytes': peak,
+                    })
+                    print(f'{case:40s} {stage:12s} {wall:10.4f} s {peak / 1024 ** 2:10.1f} MiB')
+    return results
+
+
+def run_startup(repeat: int = 1) -> List[StageResult]:
+    '''
+    Time from interpreter start-up to `import main_gui`, to the window being
+    mapped and to all frames being built. The last two need a display.
+    '''
+    best = {}
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', STARTUP_SCRIPT],
+            cwd=Path(__file__).parent.parent,
+            capture_output=True, text=True, check=True
+        ).stdout
+        report = json.loads(output.splitlines()[-1])
+        for stage, seconds in report['times'].items():
+            best[stage] = min(seconds, best.get(stage, seconds))
+    if report['eager']:
+        print(f"startup imports {', '.join(report['eager'])} eagerly")
+    results: List[StageResult] = []
+    for stage, seconds in best.items():
+        results.append({
+            'case': 'startup', 'stage': stage, 'wall': seconds, 'peak_bytes': 0,
+        })
+        print(f"{'startup':40s} {stage:12s} {seconds:10.4f} s")
+    return results
+
+
+def find_regressions(
+        results: Sequence[StageResult], baseline: Sequence[StageResult],
+        threshold: float) -> List[str]:
+
+    previous = {(r['case'], r['stage']): r['wall'] for r in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result['case'], result['stage']))
+        if old is None:
+            continue
+        new = result['wall']
+        if new > old * (1 + threshold) and new - old > MIN_REGRESSION_SECONDS:
+            regressions.append(
+                f"{result['case']} {result['stage']}: "
+                f'{old:.4f} s -> {new:.4f} s ({new / old - 1:+.0%})'
+            )
+    return regressions
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark CSViewer stages.')
+    parser.add_argument('--rows', nargs='+', type=float, default=[1e3, 1e5])
+    parser.add_argument('--columns', nargs='+', type=int, default=[2, 20])
+    parser.add_argument('--header', choices=('yes', 'no', 'both'), default='both')
+    parser.add_argument('--data-dir', default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true')
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--compare', default=None)
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--startup-target', type=float, default=STARTUP_TARGET_SECONDS)
+    args = parser.parse_args(argv)
+
+    data_cache.max_bytes = 0
+    headers = {'yes': [True], 'no': [False], 'both': [True, False]}[args.header]
+    data_dir = Path(args.data_dir or tempfile.gettempdir()).joinpath('csviewer-bench')
+    results = run_startup(args.repeat)
+    is_failed = False
+    for result in results:
+        if result['stage'] != 'ready' and result['wall'] > args.startup_target:
+            print(
+                f"STARTUP {result['stage']}: {result['wall']:.4f} s "
+                f'exceeds the target of {args.startup_target:.4f} s'
+            )
+            is_failed = True
+    results += run(
+        [int(rows) for rows in args.rows], args.columns, headers, data_dir,
+        args.repeat, not args.no_memory
+    )
+
+    if args.output:
+        report = {
+            'python': sys.version,
+            'platform': platform.platform(),
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)['results']
+        regressions = find_regressions(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            is_failed = True
+    return 1 if is_failed else 0
@@ -0,0 +1,91 @@
+'''
+Copy images to the system clipboard.
+
+The backend for the platform is picked, and on Windows `win32clipboard`
+imported, the first time an image is copied:
+- Windows: win32clipboard (pywin32)
+- macOS: osascript
+- Linux: wl-copy on Wayland, xclip on X11
+'''
+import functools
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Callable, Sequence
+
+
+class Error(Exception):
+    '''Base class for exceptions in this module.'''
+    pass
+
+
+class NoBackendError(Error):
+    '''Exception raised when no clipboard tool is available.'''
+    message = 'No clipboard tool found. Please install wl-clipboard or xclip.'
+
+
+class CopyFailedError(Error):
+    '''Exception raised when the clipboard tool failed.'''
+    message = 'Copying to the clipboard failed.'
+
+
+def copy_png_win32(data: bytes):
+    '''
+    Honestly, I don't know how it works. Here is the reference I found.
+    https://stackoverflow.com/questions/7050448/write-image-to-windows-clipboard-in-python-with-pil-and-win32clipboard
+
+    This method can copy the figure image and paste to MS office but not Paint.
+    '''
+    import win32clipboard
+
+    clipboard_format = win32clipboard.RegisterClipboardFormat('PNG')
+    win32clipboard.OpenClipboard()
+    try:
+        win32clipboard.EmptyClipboard()
+        win32clipboard.SetClipboardData(clipboard_format, data)
+    finally:
+        win32clipboard.CloseClipboard()
+
+
+def run_command(command: Sequence[str], data: bytes = None):
+    try:
+        subprocess.run(command, input=data, check=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        raise CopyFailedError
+
+
+def copy_png_macos(data: bytes):
+    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as f:
+        f.write(data)
+    try:
+        script = f'set the clipboard to (read (POSIX file "{f.name}") as «class PNGf»)'
+        run_command(['osascript', '-e', script])
+    finally:
+        os.remove(f.name)
+
+
+def copy_png_wayland(data: bytes):
+    run_command(['wl-copy', '--type', 'image/png'], data)
+
+
+def copy_png_x11(data: bytes):
+    run_command(['xclip', '-selection', 'clipboard', '-t', 'image/png', '-i'], data)
+
+
+@functools.lru_cache(maxsize=None)
+def get_backend() -> Callable[[bytes], None]:
+    if sys.platform == 'win32':
+        return copy_png_win32
+    if sys.platform == 'darwin':
+        return copy_png_macos
+    if os.environ.get('WAYLAND_DISPLAY') and shutil.which('wl-copy'):
+        return copy_png_wayland
+    if shutil.which('xclip'):
+        return copy_png_x11
+    raise NoBackendError
+
+
+def copy_png(data: bytes):
+    get_backend()(data)
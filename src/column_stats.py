@@ -0,0 +1,173 @@
+from typing import Dict, List, Optional, TypedDict
+
+import numpy as np
+import pandas as pd
+
+import perf
+from data_cache import data_cache, make_key
+
+
+BLOCK_ROWS = 65_536
+
+
+class ColumnStats(TypedDict):
+    dtype: str
+    count: int
+    nan_count: int
+    min: Optional[float]
+    max: Optional[float]
+    is_increasing: bool
+    is_decreasing: bool
+    is_positive: bool
+
+
+class StatsAccumulator:
+    '''
+    Running statistics of the columns of a frame. Numeric columns are read
+    in blocks of rows, each block as one 2-D float array, so a block is
+    reduced for all columns at once and the data is passed over only once.
+    Rows appended later, e.g. in follow mode, are added with `update`.
+    '''
+    def __init__(self, dtypes: Dict[str, str]):
+        self.dtypes = dict(dtypes)
+        self.numeric = [
+            column for column, dtype in self.dtypes.items()
+            if is_numeric(dtype)
+        ]
+        size = len(self.numeric)
+        self.count = 0
+        self.nan_counts = dict.fromkeys(self.dtypes, 0)
+        self.min = np.full(size, np.nan)
+        self.max = np.full(size, np.nan)
+        self.is_increasing = np.ones(size, dtype=bool)
+        self.is_decreasing = np.ones(size, dtype=bool)
+        self.is_positive = np.ones(size, dtype=bool)
+        self.last: np.ndarray = None
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'StatsAccumulator':
+        accumulator = cls({
+            str(column): str(dtype) for column, dtype in df.dtypes.items()
+        })
+        accumulator.update(df)
+        return accumulator
+
+    def update(self, df: pd.DataFrame):
+        df = df.set_axis([str(column) for column in df.columns], axis=1)
+        for column in self.dtypes:
+            if column not in self.numeric:
+                self.nan_counts[column] += int(df[column].isna().sum())
+        if self.numeric:
+            positions = [df.columns.get_loc(column) for column in self.numeric]
+            for start in range(0, len(df), BLOCK_ROWS):
+                block = df.iloc[start:start + BLOCK_ROWS, positions]
+                self.update_block(block.to_numpy(dtype='float64', na_value=np.nan))
+        self.count += len(df)
+
+    def update_block(self, block: np.ndarray):
+        nan_counts = np.isnan(block).sum(axis=0)
+        for column, nan_count in zip(self.numeric, nan_counts):
+            self.nan_counts[column] += int(nan_count)
+        self.min = np.fmin(self.min, np.fmin.reduce(block, axis=0))
+        self.max = np.fmax(self.max, np.fmax.reduce(block, axis=0))
+        self.is_positive &= ~np.any(block <= 0, axis=0)
+        if self.last is not None:
+            block_with_last = np.vstack([self.last, block])
+        else:
+            block_with_last = block
+        steps = np.diff(block_with_last, axis=0)
+        # NaN steps compare False and end monotonicity, as in plotting
+        self.is_increasing &= np.all(steps >= 0, axis=0)
+        self.is_decreasing &= np.all(steps <= 0, axis=0)
+        self.last = block[-1]
+
+    def get_stats(self) -> Dict[str, ColumnStats]:
+        stats: Dict[str, ColumnStats] = {}
+        for column, dtype in self.dtypes.items():
+            stats[column] = {
+                'dtype': dtype,
+                'count': self.count,
+                'nan_count': self.nan_counts[column],
+                'min': None,
+                'max': None,
+                'is_increasing': False,
+                'is_decreasing': False,
+                'is_positive': False,
+            }
+        for idx, column in enumerate(self.numeric):
+            has_values = not np.isnan(self.min[idx])
+            stats[column].update({
+                'min': float(self.min[idx]) if has_values else None,
+                'max': float(self.max[idx]) if has_values else None,
+                'is_increasing': bool(self.is_increasing[idx]),
+                'is_decreasing': bool(self.is_decreasing[idx]),
+                'is_positive': has_values and bool(self.is_positive[idx]),
+            })
+        return stats
+
+    def to_dict(self) -> Dict:
+        return {
+            'dtypes': self.dtypes,
+            'count': self.count,
+            'nan_counts': self.nan_counts,
+            'min': self.min.tolist(),
+            'max': self.max.tolist(),
+            'is_increasing': self.is_increasing.tolist(),
+            'is_decreasing': self.is_decreasing.tolist(),
+            'is_positive': self.is_positive.tolist(),
+            'last': None if self.last is None else self.last.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'StatsAccumulator':
+        accumulator = cls(state['dtypes'])
+        accumulator.count = state['count']
+        accumulator.nan_counts = state['nan_counts']
+        accumulator.min = np.array(state['min'], dtype='float64')
+        accumulator.max = np.array(state['max'], dtype='float64')
+        accumulator.is_increasing = np.array(state['is_increasing'], dtype=bool)
+        accumulator.is_decreasing = np.array(state['is_decreasing'], dtype=bool)
+        accumulator.is_positive = np.array(state['is_positive'], dtype=bool)
+        if state['last'] is not None:
+            accumulator.last = np.array(state['last'], dtype='float64')
+        return accumulator
+
+
+def is_numeric(dtype: str) -> bool:
+    try:
+        dtype = pd.api.types.pandas_dtype(dtype)
+    except TypeError:
+        return False
+    return (
+        pd.api.types.is_numeric_dtype(dtype)
+        and not pd.api.types.is_complex_dtype(dtype)
+    )
+
+
+@perf.timed('column_stats', 'import')
+def get_stats(path: str, df: pd.DataFrame) -> StatsAccumulator:
+    '''
+    Statistics of a loaded file, cached next to the parsed data. The key
+    includes the dtypes, since a compact import changes them.
+    '''
+    dtypes = {str(column): str(dtype) for column, dtype in df.dtypes.items()}
+    key = make_key(path, {'stats': dtypes})
+    state = data_cache.load_json(key)
+    if state is not None:
+        return StatsAccumulator.from_dict(state)
+    perf.count(rows=len(df))
+    accumulator = StatsAccumulator.from_dataframe(df)
+    data_cache.store_json(key, accumulator.to_dict())
+    return accumulator
+
+
+def get_field_range(
+        stats: List[ColumnStats]) -> Optional[List[float]]:
+    '''
+    Smallest minimum and largest maximum of several columns.
+    '''
+    minimums = [s['min'] for s in stats if s['min'] is not None]
+    maximums = [s['max'] for s in stats if s['max'] is not None]
+    if not minimums or not maximums:
+        return None
+    return [min(minimums), max(maximums)]
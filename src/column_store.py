@@ -0,0 +1,197 @@
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, TypedDict
+
+import numpy as np
+import pandas as pd
+
+from data_cache import evict_least_recent
+
+
+STORE_DIR = Path(os.environ.get(
+    'CSVIEWER_STORE_DIR',
+    Path.home().joinpath('.csviewer', 'store')
+))
+STORE_MAX_MB = int(os.environ.get('CSVIEWER_STORE_MAX_MB', 4096))
+MANIFEST = 'manifest.json'
+TEXT_COLUMNS = 'text.pkl'
+NUMERIC_DTYPE = np.dtype('float64')
+
+
+class StoredColumn(TypedDict):
+    name: str
+    file: str
+
+
+class Source(TypedDict):
+    path: str
+    size: int
+    mtime_ns: int
+
+
+def get_source(path: str) -> Source:
+    stat = os.stat(path)
+    return {
+        'path': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+
+
+def get_size(entry: Path) -> int:
+    return sum(f.stat().st_size for f in entry.iterdir())
+
+
+def write_npy_header(f, dtype: np.dtype, rows: int):
+    header = {
+        'descr': np.lib.format.dtype_to_descr(dtype),
+        'fortran_order': False,
+        'shape': (rows,),
+    }
+    np.lib.format.write_array_header_1_0(f, header)
+
+
+class ColumnStore:
+    '''
+    Parsed CSV files as one memory-mapped `.npy` file per numeric column,
+    evicted like the data cache.
+    '''
+    def __init__(
+            self, directory: Path = STORE_DIR,
+            max_bytes: int = STORE_MAX_MB * 1024 ** 2):
+
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    def get_entry_dir(self, key: str) -> Path:
+        return self.directory.joinpath(key)
+
+    def has(self, key: str) -> bool:
+        return self.get_entry_dir(key).joinpath(MANIFEST).exists()
+
+    def read_manifest(self, entry: Path) -> Optional[Dict]:
+        try:
+            with open(entry.joinpath(MANIFEST), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write(
+            self, key: str, chunks: Iterable[pd.DataFrame],
+            source: str = None):
+
+        entry = self.get_entry_dir(key)
+        temp = entry.with_name(f'{entry.name}.{threading.get_ident()}.tmp')
+        shutil.rmtree(temp, ignore_errors=True)
+        temp.mkdir(parents=True)
+        columns: List[StoredColumn] = []
+        handles: Dict[str, BinaryIO] = {}
+        texts: List[pd.DataFrame] = []
+        rows = 0
+        try:
+            for chunk in chunks:
+                if not columns:
+                    for idx, name in enumerate(chunk.columns):
+                        if pd.api.types.is_numeric_dtype(chunk[name]):
+                            file = f'column-{idx}.npy'
+                            handles[name] = f = open(temp.joinpath(file), 'wb')
+                            write_npy_header(f, NUMERIC_DTYPE, 0)
+                        else:
+                            file = ''
+                        columns.append({'name': str(name), 'file': file})
+                for name, f in handles.items():
+                    chunk[name].to_numpy(dtype=NUMERIC_DTYPE).tofile(f)
+                text_names = [c['name'] for c in columns if not c['file']]
+                if text_names:
+                    texts.append(chunk[text_names])
+                rows += len(chunk)
+
+            if not columns:
+                raise ValueError('No data to store.')
+            for f in handles.values():
+                f.seek(0)
+                write_npy_header(f, NUMERIC_DTYPE, rows)
+                f.close()
+            if texts:
+                text = pd.concat(texts, ignore_index=True)
+                text.to_pickle(temp.joinpath(TEXT_COLUMNS))
+            manifest = {'rows': rows, 'columns': columns}
+            if source is not None:
+                manifest['source'] = get_source(source)
+            with open(temp.joinpath(MANIFEST), 'w') as f:
+                json.dump(manifest, f)
+        except BaseException:
+            for f in handles.values():
+                f.close()
+            shutil.rmtree(temp, ignore_errors=True)
+            raise
+
+        if entry.exists() and not self.has(key):
+            shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.replace(temp, entry)
+        except OSError:
+            # another worker stored the same file first
+            shutil.rmtree(temp, ignore_errors=True)
+        self.evict(key, manifest.get('source'))
+
+    def evict(self, key: str, source: Source = None):
+        '''
+        Remove older versions of `source`, then the least recently used
+        entries other than `key` above `max_bytes`.
+        '''
+        with self.lock:
+            entries = []
+            for entry in self.directory.iterdir():
+                if entry.name == key or entry.suffix == '.tmp':
+                    continue
+                manifest = self.read_manifest(entry)
+                if manifest is None:
+                    continue
+                stored = manifest.get('source')
+                is_stale = (
+                    source is not None and stored is not None
+                    and stored['path'] == source['path'] and stored != source
+                )
+                if is_stale:
+                    shutil.rmtree(entry, ignore_errors=True)
+                    continue
+                try:
+                    mtime = entry.joinpath(MANIFEST).stat().st_mtime
+                    entries.append((mtime, get_size(entry), entry))
+                except FileNotFoundError:
+                    continue
+            try:
+                max_bytes = self.max_bytes - get_size(self.get_entry_dir(key))
+            except FileNotFoundError:
+                max_bytes = self.max_bytes
+            evict_least_recent(
+                entries, max_bytes,
+                lambda entry: shutil.rmtree(entry, ignore_errors=True)
+            )
+
+    def load(self, key: str) -> pd.DataFrame:
+        entry = self.get_entry_dir(key)
+        with open(entry.joinpath(MANIFEST), 'r') as f:
+            manifest = json.load(f)
+        os.utime(entry.joinpath(MANIFEST))
+        text_path = entry.joinpath(TEXT_COLUMNS)
+        text = pd.read_pickle(text_path) if text_path.exists() else None
+        data = {}
+        for column in manifest['columns']:
+            name = column['name']
+            if column['file']:
+                data[name] = np.load(entry.joinpath(column['file']), mmap_mode='r')
+            else:
+                data[name] = text[name].to_numpy()
+        return pd.DataFrame(data, copy=False)
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+column_store = ColumnStore()
@@ -0,0 +1,61 @@
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+import perf
+
+
+FLOAT32_STEP_TOLERANCE = 0.1
+CATEGORY_RATIO = 0.5
+
+
+def is_float32_safe(values: np.ndarray) -> bool:
+    '''
+    float32 is safe when its rounding error stays below a tenth of the
+    typical step between neighbouring values. Accelerations pass easily;
+    large time stamps, e.g. epoch seconds, do not.
+    '''
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return True
+    if np.abs(finite).max() > np.finfo(np.float32).max:
+        return False
+    error = np.abs(finite.astype(np.float32) - finite).max()
+    if error == 0:
+        return True
+    steps = np.abs(np.diff(finite))
+    steps = steps[steps > 0]
+    if not len(steps):
+        return False
+    return error <= FLOAT32_STEP_TOLERANCE * np.median(steps)
+
+
+def compact_series(series: pd.Series) -> pd.Series:
+    dtype = series.dtype
+    if pd.api.types.is_float_dtype(dtype) and dtype.itemsize > 4:
+        if is_float32_safe(series.to_numpy()):
+            return series.astype(np.float32)
+    elif pd.api.types.is_integer_dtype(dtype):
+        return pd.to_numeric(series, downcast='integer')
+    elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        if series.nunique(dropna=True) <= CATEGORY_RATIO * len(series):
+            return series.astype('category')
+    return series
+
+
+@perf.timed('compact', 'import')
+def compact_dataframe(df: pd.DataFrame) -> Tuple[pd.DataFrame, int, int]:
+    '''
+    Downcast each column to the smallest dtype which keeps its values:
+    float32 where safe, the smallest integer type, and categoricals for
+    text which repeats. Returns the frame with its memory before and after.
+    '''
+    before = int(df.memory_usage(deep=True).sum())
+    compacted = pd.DataFrame(
+        {column: compact_series(df[column]) for column in df.columns},
+        copy=False
+    )
+    after = int(compacted.memory_usage(deep=True).sum())
+    perf.count(rows=len(df), nbytes=before)
+    return compacted, before, after
@@ -0,0 +1,433 @@
+import csv
+import gzip
+import io
+import lzma
+import os
+import re
+import threading
+from io import StringIO
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, Sequence, Tuple, TypedDict
+
+import pandas as pd
+
+import perf
+from column_store import column_store
+from data_cache import data_cache, make_key
+
+
+SAMPLE_BYTES = 64 * 1024
+DELIMITERS = ',;\t| '
+CHUNK_ROWS = 200_000
+IMPORT_MODES = ('memory', 'mmap', 'lazy')
+PREVIEW_ROWS = 200
+COMPRESSIONS = {'.gz': 'gzip', '.xz': 'xz', '.zst': 'zstd'}
+CSV_PATTERNS = ('*.csv', *(f'*.csv{suffix}' for suffix in COMPRESSIONS))
+
+
+class Error(Exception):
+    '''Base class for exceptions in this module.'''
+    pass
+
+
+class ImportCancelledError(Error):
+    '''Exception raised when an import is cancelled before it finishes.'''
+    message = 'Import cancelled.'
+
+
+class CsvSchema(TypedDict):
+    has_header: bool
+    delimiter: str
+    decimal: str
+    columns: Sequence[str]
+    dtypes: Dict[str, str]
+
+
+FileKey = Tuple[int, int]
+
+
+def get_file_key(path: str) -> FileKey:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def get_compression(path: str) -> str:
+    return COMPRESSIONS.get(Path(path).suffix.lower())
+
+
+def decompress(raw: BinaryIO, path: str) -> BinaryIO:
+    '''
+    Stream which decompresses `raw` while it is read, or `raw` itself for
+    plain CSV files. `raw.tell()` keeps counting compressed bytes.
+    '''
+    compression = get_compression(path)
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+    if compression == 'xz':
+        return lzma.LZMAFile(raw, mode='rb')
+    if compression == 'zstd':
+        import zstandard
+
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, closefd=False)
+        return io.BufferedReader(reader)
+    return raw
+
+
+class LimitedReader(io.RawIOBase):
+    '''
+    Reads at most `limit` bytes of `raw`, so a file which grows during an
+    import is parsed as it was when the import started.
+    '''
+    def __init__(self, raw: BinaryIO, limit: int):
+        self.raw = raw
+        self.remaining = limit
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self.remaining)
+        if size <= 0:
+            return 0
+        data = self.raw.read(size)
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+
+def get_complete_size(
+        path: str, size: int = None,
+        block_size: int = SAMPLE_BYTES) -> int:
+    '''
+    Bytes up to and including the last newline of the first `size` bytes
+    of a plain CSV file. Compressed files count as complete.
+    '''
+    if size is None:
+        size = os.path.getsize(path)
+    if get_compression(path) is not None:
+        return size
+    with open(path, 'rb') as f:
+        end = size
+        while end > 0:
+            start = max(end - block_size, 0)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                return start + newline + 1
+            end = start
+    return 0
+
+
+def get_file_family(path: str) -> str:
+    '''
+    Files such as `elcentro_UP.csv`, `elcentro_NS.csv` and `elcentro_EW.csv`
+    in the same folder share the family `<folder>/elcentro*.csv`. Only a
+    trailing alphabetic label is dropped, so versions or dates such as
+    `data_v1.csv` and `data_v2.csv` are families of their own.
+    '''
+    path = Path(path)
+    stem, suffix = path.stem, path.suffix
+    if get_compression(path):
+        stem, suffix = Path(stem).stem, Path(stem).suffix + suffix
+    stem = re.sub(r'(?<=.)[_\-][A-Za-z]+$', '', stem)
+    return str(path.parent.joinpath(f'{stem}*{suffix}'))
+
+
+def read_prefix(path: str, size: int = SAMPLE_BYTES) -> str:
+    '''
+    First `size` bytes of the file, decompressed, cut after the last
+    complete line.
+    '''
+    with open(path, 'rb') as raw, decompress(raw, path) as f:
+        data = f.read(size)
+    text = data.decode('utf-8', errors='replace')
+    if len(data) == size and '\n' in text:
+        text = text[:text.rindex('\n') + 1]
+    return text
+
+
+def read_first_line(path: str) -> str:
+    with open(path, 'rb') as raw, decompress(raw, path) as f:
+        data = f.readline(SAMPLE_BYTES)
+    return data.decode('utf-8', errors='replace')
+
+
+def is_compatible(schema: CsvSchema, line: str) -> bool:
+    '''
+    Whether the first line of a file fits a schema sniffed from another
+    file: same delimiter and number of fields, and the same column names
+    if the schema has a header, otherwise numbers in its numeric columns.
+    '''
+    try:
+        fields = next(csv.reader([line], delimiter=schema['delimiter']))
+    except (csv.Error, StopIteration):
+        return False
+    if len(fields) != len(schema['columns']):
+        return False
+    if schema['has_header']:
+        return [field.strip() for field in fields] == [
+            column.strip() for column in schema['columns']
+        ]
+    for field, column in zip(fields, schema['columns']):
+        if not pd.api.types.is_numeric_dtype(schema['dtypes'][column]):
+            continue
+        try:
+            float(field.replace(schema['decimal'], '.'))
+        except ValueError:
+            return False
+    return True
+
+
+@perf.timed('sniff_schema', 'import')
+def sniff_schema(sample: str) -> CsvSchema:
+    sniffer = csv.Sniffer()
+    try:
+        delimiter = sniffer.sniff(sample, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ','
+    try:
+        has_header = sniffer.has_header(sample)
+    except csv.Error:
+        has_header = False
+    if delimiter != ',' and re.search(r'\d,\d', sample):
+        decimal = ','
+    else:
+        decimal = '.'
+
+    df = pd.read_csv(
+        StringIO(sample),
+        sep=delimiter,
+        decimal=decimal,
+        header=0 if has_header else None
+    )
+    if not has_header:
+        df.columns = [f'column-{col}' for col in df.columns]
+    schema: CsvSchema = {
+        'has_header': has_header,
+        'delimiter': delimiter,
+        'decimal': decimal,
+        'columns': [str(column) for column in df.columns],
+        'dtypes': {str(column): str(dtype) for column, dtype in df.dtypes.items()}
+    }
+    return schema
+
+
+class SchemaCache:
+    '''
+    Schemas by path. The first file of a family is sniffed and its schema
+    is reused for the siblings whose first line fits it; the others are
+    sniffed on their own.
+    '''
+    def __init__(self):
+        self.paths: Dict[str, Tuple[FileKey, CsvSchema]] = {}
+        self.families: Dict[str, Tuple[str, FileKey, CsvSchema]] = {}
+
+    def get(self, path: str) -> CsvSchema:
+        path = os.path.abspath(path)
+        key = get_file_key(path)
+        cached = self.paths.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        family = get_file_family(path)
+        cached = self.families.get(family)
+        if cached is not None:
+            seed_path, seed_key, schema = cached
+            if seed_path == path or get_file_key(seed_path) != seed_key:
+                cached = None
+                del self.families[family]
+            elif not is_compatible(schema, read_first_line(path)):
+                cached = None
+        if cached is None:
+            schema = sniff_schema(read_prefix(path))
+            self.families.setdefault(family, (path, key, schema))
+        self.paths[path] = (key, schema)
+        return schema
+
+    def clear(self):
+        self.paths = {}
+        self.families = {}
+
+
+schema_cache = SchemaCache()
+
+
+def get_read_options(schema: CsvSchema) -> Dict:
+    options = {
+        'sep': schema['delimiter'],
+        'decimal': schema['decimal'],
+    }
+    if schema['has_header']:
+        options['header'] = 0
+    else:
+        options['header'] = None
+        options['names'] = list(schema['columns'])
+    options['dtype'] = {
+        column: 'float64' for column, dtype in schema['dtypes'].items()
+        if dtype.startswith('float')
+    }
+    return options
+
+
+def open_csv(raw: BinaryIO, path: str, limit: int = None) -> BinaryIO:
+    if limit is None or get_compression(path) is not None:
+        return decompress(raw, path)
+    return io.BufferedReader(LimitedReader(raw, limit))
+
+
+def iter_csv_chunks(
+        path: str, options: Dict,
+        progress: Callable[[float], None] = None,
+        cancel: threading.Event = None,
+        limit: int = None) -> Iterator[pd.DataFrame]:
+
+    size = max(os.path.getsize(path) if limit is None else limit, 1)
+    with open(path, 'rb') as raw, open_csv(raw, path, limit) as f:
+        for chunk in pd.read_csv(f, chunksize=CHUNK_ROWS, **options):
+            if cancel is not None and cancel.is_set():
+                raise ImportCancelledError
+            yield chunk
+            if progress is not None:
+                progress(min(raw.tell() / size, 1.0))
+
+
+def read_csv_chunked(
+        path: str, options: Dict,
+        progress: Callable[[float], None] = None,
+        cancel: threading.Event = None,
+        limit: int = None) -> pd.DataFrame:
+
+    chunks = list(iter_csv_chunks(path, options, progress, cancel, limit))
+    if not chunks:
+        with open(path, 'rb') as raw, open_csv(raw, path, limit) as f:
+            return pd.read_csv(f, **options)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def get_cache_options(
+        path: str, options: Dict, limit: int = None) -> Dict:
+    # a limit which covers the whole file does not change the result
+    if limit is None or limit >= os.path.getsize(path):
+        return options
+    return {**options, 'limit': limit}
+
+
+def read_csv(
+        path: str, schema: CsvSchema = None,
+        progress: Callable[[float], None] = None,
+        cancel: threading.Event = None,
+        use_cache: bool = True,
+        limit: int = None) -> pd.DataFrame:
+    '''
+    Parse a CSV file, or its first `limit` bytes.
+    '''
+    if schema is None:
+        schema = schema_cache.get(path)
+    options = get_read_options(schema)
+    if use_cache:
+        key = make_key(path, get_cache_options(path, options, limit))
+        df = data_cache.load(key)
+        if df is not None:
+            if progress is not None:
+                progress(1.0)
+            return df
+
+    try:
+        df = read_csv_chunked(path, options, progress, cancel, limit)
+    except ValueError:
+        # the prefix guessed a float column which holds text further down
+        options.pop('dtype')
+        df = read_csv_chunked(path, options, progress, cancel, limit)
+    if use_cache:
+        data_cache.store(key, df)
+    return df
+
+
+def read_csv_mmap(
+        path: str, schema: CsvSchema = None,
+        progress: Callable[[float], None] = None,
+        cancel: threading.Event = None,
+        limit: int = None) -> pd.DataFrame:
+
+    if schema is None:
+        schema = schema_cache.get(path)
+    options = get_read_options(schema)
+    options.pop('dtype')
+    key = make_key(path, get_cache_options(path, options, limit))
+    if not column_store.has(key):
+        chunks = iter_csv_chunks(path, options, progress, cancel, limit)
+        column_store.write(key, chunks, source=path)
+    elif progress is not None:
+        progress(1.0)
+    return column_store.load(key)
+
+
+class LazyFrame:
+    '''
+    Stand-in for a DataFrame which only reads the header and a short preview
+    up front. Columns are parsed on demand with `usecols` and memoized, so
+    the cost of a plot scales with the fields it uses, not the file width.
+    '''
+    def __init__(self, path: str, schema: CsvSchema = None):
+        if schema is None:
+            schema = schema_cache.get(path)
+        self.path = path
+        self.options = get_read_options(schema)
+        self.preview = pd.read_csv(path, nrows=PREVIEW_ROWS, **self.options)
+        self.columns = self.preview.columns
+        self.loaded: Dict[str, pd.Series] = {}
+
+    def load(self, columns: Sequence[str]):
+        missing = list(dict.fromkeys(
+            column for column in columns if column not in self.loaded
+        ))
+        if not missing:
+            return
+        options = dict(self.options)
+        if 'names' in options:
+            options['usecols'] = missing
+        else:
+            options['usecols'] = lambda column: column in missing
+        try:
+            df = pd.read_csv(self.path, **options)
+        except ValueError:
+            options.pop('dtype')
+            df = pd.read_csv(self.path, **options)
+        for column in missing:
+            self.loaded[column] = df[column]
+
+    def __getitem__(self, column: str) -> pd.Series:
+        self.load([column])
+        return self.loaded[column]
+
+
+@perf.timed('load_csv', 'import')
+def load_csv(
+        path: str, mode: str = 'memory',
+        progress: Callable[[float], None] = None,
+        cancel: threading.Event = None,
+        limit: int = None) -> pd.DataFrame:
+    '''
+    Load a CSV file in one of `IMPORT_MODES`. With `limit` only the first
+    `limit` bytes are parsed, e.g. the size of a growing file when its
+    import started; lazy frames ignore it.
+    '''
+    perf.count(nbytes=os.path.getsize(path))
+    if mode == 'lazy':
+        frame = LazyFrame(path)
+        if progress is not None:
+            progress(1.0)
+        return frame
+    df = None
+    if mode == 'mmap':
+        try:
+            df = read_csv_mmap(
+                path, progress=progress, cancel=cancel, limit=limit
+            )
+        except ValueError:
+            # empty file or text inside a numeric column
+            pass
+    if df is None:
+        df = read_csv(path, progress=progress, cancel=cancel, limit=limit)
+    perf.count(rows=len(df))
+    return df
@@ -1,8 +1,12 @@
+from __future__ import annotations
+
 import tkinter as tk
 from tkinter import ttk
-from typing import Sequence, Union, Dict
+from typing import TYPE_CHECKING, Dict, Optional, Sequence, Tuple, Union
 
-import pandas as pd
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
 
 class Treeview(ttk.Treeview):
@@ -25,6 +29,9 @@ class Treeview(ttk.Treeview):
         self.pack(fill='both')
         scrollbar_ver.config(command=self.yview)
         scrollbar_hor.config(command=self.xview)
+        self.scrollbar_ver = scrollbar_ver
+        self.scrollbar_hor = scrollbar_hor
+        self.height = height
         self['columns'] = columns
         self['show'] = 'headings'
         for column in columns:
@@ -44,6 +51,8 @@ class Treeview(ttk.Treeview):
             )
 
     def get_dataframe(self) -> pd.DataFrame:
+        import pandas as pd
+
         columns = self['columns']
         data = {column: [] for column in columns}
         for line in self.get_children():
@@ -52,18 +61,15 @@ class Treeview(ttk.Treeview):
                 data[column].append(value)
         return pd.DataFrame(data)
 
-    def adjust_column_width(self):
-        lengths = {
-            column: [len(column), ] for column in self['columns']
-        }
-        for line in self.get_children():
-            columns = self['columns']
-            values = self.item(line)['values']
-            for column, value in zip(columns, values):
-                lengths[column].append(len(str(value)))
+    def adjust_column_width(
+            self, df: pd.DataFrame = None, sample_size: int = None):
 
+        if df is None:
+            df = self.get_dataframe()
+        lengths = measure_column_lengths(df, sample_size)
         for column in self['columns']:
-            width = Treeview.COLUMN_WIDTH_RATIO * max(lengths[column])
+            length = max(len(column), lengths.get(column, 0))
+            width = Treeview.COLUMN_WIDTH_RATIO * length
             self.column(
                 column,
                 anchor=tk.W,
@@ -72,6 +78,278 @@ class Treeview(ttk.Treeview):
             )
 
 
+def sample_rows(df: pd.DataFrame, sample_size: int) -> pd.DataFrame:
+    '''
+    Head, tail and randomly chosen rows, at most `sample_size` in total.
+    '''
+    import numpy as np
+
+    if len(df) <= sample_size:
+        return df
+    edge = sample_size // 4
+    middle = np.random.default_rng(0).choice(
+        np.arange(edge, len(df) - edge),
+        size=sample_size - 2 * edge,
+        replace=False
+    )
+    positions = np.concatenate([
+        np.arange(edge),
+        np.sort(middle),
+        np.arange(len(df) - edge, len(df))
+    ])
+    return df.iloc[positions]
+
+
+def measure_column_lengths(
+        df: pd.DataFrame, sample_size: int = None) -> Dict[str, int]:
+
+    import pandas as pd
+
+    if sample_size is not None:
+        df = sample_rows(df, sample_size)
+    lengths = {}
+    for column in df.columns:
+        series_length = df[column].astype(str).str.len().max()
+        lengths[str(column)] = 0 if pd.isna(series_length) else int(series_length)
+    return lengths
+
+
+class VirtualTreeview(Treeview):
+    '''
+    Treeview backed by a DataFrame. Only the rows inside the visible scroll
+    window (plus a small overscan on both sides) exist as Tk items; they are
+    re-filled from the DataFrame whenever the view leaves that window.
+
+    Clicking a heading sorts by that column, and clicking it again reverses
+    the order. Sorting computes a permutation of the frame's rows, cached
+    per column and direction, and the view reads through it, so no Tk item
+    is moved. With a filter the view is `P[M[P]]`: the permutation `P`
+    masked by the filtered rows `M`.
+    '''
+    SORT_ARROWS = {False: ' \u25b2', True: ' \u25bc'}
+    OVERSCAN = 20
+    WHEEL_UNITS = 3
+    WIDTH_SAMPLE_SIZE = 1000
+
+    def __init__(
+            self, frame: Union[tk.Frame, ttk.Frame],
+            columns: Sequence[str], height: int):
+
+        import pandas as pd
+
+        super().__init__(frame, columns, height)
+        self.config(yscrollcommand='')
+        self.scrollbar_ver.config(command=self.yview_virtual)
+        self.bind('<MouseWheel>', self.on_mousewheel)
+        self.bind('<Button-4>', lambda event: self.scroll_rows(-self.WHEEL_UNITS))
+        self.bind('<Button-5>', lambda event: self.scroll_rows(self.WHEEL_UNITS))
+        self.bind('<Configure>', lambda event: self.render())
+        self.dataframe = pd.DataFrame(columns=columns)
+        self.rows: np.ndarray = None
+        self.filtered_rows: np.ndarray = None
+        self.sort_key: Optional[Tuple[str, bool]] = None
+        self.permutations: Dict[Tuple[str, bool], np.ndarray] = {}
+        self.first_row = 0
+        self.window = (0, 0)
+        for column in columns:
+            self.heading(column, command=lambda column=column: self.sort_by(column))
+
+    @property
+    def row_count(self) -> int:
+        if self.rows is None:
+            return len(self.dataframe)
+        return len(self.rows)
+
+    def clear_content(self):
+        super().clear_content()
+        self.window = (0, 0)
+
+    def set_dataframe(self, df: pd.DataFrame):
+        self.dataframe = df
+        self.rows = None
+        self.filtered_rows = None
+        self.permutations = {}
+        self.first_row = 0
+        self.clear_content()
+        self.render()
+
+    def set_rows(self, rows: np.ndarray = None):
+        '''
+        Show only the rows at the positions `rows`, or all rows with None.
+        Only the visible window is re-filled.
+        '''
+        self.filtered_rows = rows
+        self.first_row = 0
+        self.update_rows()
+        self.window = (0, 0)
+        self.render()
+
+    def update_dataframe(self, df: pd.DataFrame, rows: np.ndarray = None):
+        '''
+        Swap in a longer version of the same table, e.g. after new rows were
+        appended, keeping the scroll position. `rows` are the filtered rows
+        of the new table. Cached permutations of float columns are extended
+        by the new rows; the others are sorted again when needed.
+        '''
+        start = len(self.dataframe)
+        self.dataframe = df
+        self.filtered_rows = rows
+        if len(df) < start:
+            self.permutations = {}
+        elif len(df) > start:
+            self.permutations = {
+                key: self.extend_permutation(permutation, *key, start)
+                for key, permutation in self.permutations.items()
+                if df[key[0]].dtype.kind == 'f'
+            }
+        self.update_rows()
+        self.window = (0, 0)
+        self.render()
+
+    def get_sort_values(self, column: str, descending: bool) -> np.ndarray:
+        # negating keeps NaN last and the sort stable
+        values = self.dataframe[column].to_numpy()
+        return -values if descending else values
+
+    def extend_permutation(
+            self, permutation: np.ndarray, column: str, descending: bool,
+            start: int) -> np.ndarray:
+        '''
+        Permutation of a float column with the rows from `start` on merged
+        in: only the new rows are sorted, then inserted by binary search
+        after equal values, as a stable sort of all rows would place them.
+        '''
+        import numpy as np
+
+        values = self.get_sort_values(column, descending)
+        new_rows = start + np.argsort(values[start:], kind='stable')
+        positions = np.searchsorted(
+            values[permutation], values[new_rows], side='right'
+        )
+        return np.insert(permutation, positions, new_rows)
+
+    def get_permutation(self, column: str, descending: bool) -> np.ndarray:
+        import numpy as np
+
+        key = (column, descending)
+        if key in self.permutations:
+            return self.permutations[key]
+        series = self.dataframe[column]
+        if series.dtype.kind == 'f':
+            self.permutations[key] = np.argsort(
+                self.get_sort_values(column, descending), kind='stable'
+            )
+        else:
+            values = series.reset_index(drop=True)
+            try:
+                ordered = values.sort_values(
+                    ascending=not descending, kind='stable', na_position='last'
+                )
+            except TypeError:
+                # mixed types, e.g. numbers and text in one object column
+                ordered = values.astype(str).sort_values(
+                    ascending=not descending, kind='stable'
+                )
+            self.permutations[key] = np.asarray(ordered.index)
+        return self.permutations[key]
+
+    def update_rows(self):
+        import numpy as np
+
+        if self.sort_key is None:
+            self.rows = self.filtered_rows
+            return
+        permutation = self.get_permutation(*self.sort_key)
+        if self.filtered_rows is None:
+            self.rows = permutation
+        else:
+            mask = np.zeros(len(self.dataframe), dtype=bool)
+            mask[self.filtered_rows] = True
+            self.rows = permutation[mask[permutation]]
+
+    def sort_by(self, column: str):
+        if self.sort_key is not None:
+            self.heading(self.sort_key[0], text=str(self.sort_key[0]))
+        descending = self.sort_key == (column, False)
+        self.sort_key = (column, descending)
+        self.heading(column, text=f'{column}{self.SORT_ARROWS[descending]}')
+        self.first_row = 0
+        self.update_rows()
+        self.window = (0, 0)
+        self.render()
+
+    def adjust_column_width(
+            self, df: pd.DataFrame = None, sample_size: int = None):
+
+        if df is None:
+            df = self.dataframe
+        if sample_size is None:
+            sample_size = self.WIDTH_SAMPLE_SIZE
+        super().adjust_column_width(df, sample_size)
+
+    def render(self):
+        last_first = max(self.row_count - self.height, 0)
+        self.first_row = min(max(self.first_row, 0), last_first)
+        start, stop = self.window
+        if self.first_row < start or self.first_row + self.height > stop:
+            self.materialize_window()
+            start, stop = self.window
+        if stop > start:
+            self.yview_moveto((self.first_row - start) / (stop - start))
+        self.update_scrollbar()
+
+    def materialize_window(self):
+        start = max(self.first_row - self.OVERSCAN, 0)
+        stop = min(
+            self.first_row + self.height + self.OVERSCAN,
+            self.row_count
+        )
+        if self.rows is None:
+            positions = slice(start, stop)
+        else:
+            positions = self.rows[start:stop]
+        values = self.dataframe.iloc[positions].to_numpy().tolist()
+        items = self.get_children()
+        for item, row in zip(items, values):
+            self.item(item, values=row)
+        for item in items[len(values):]:
+            self.delete(item)
+        for row in values[len(items):]:
+            self.insert(parent='', index=tk.END, values=row)
+        self.window = (start, stop)
+
+    def update_scrollbar(self):
+        if self.row_count == 0:
+            self.scrollbar_ver.set(0, 1)
+            return
+        first = self.first_row / self.row_count
+        last = min(self.first_row + self.height, self.row_count) / self.row_count
+        self.scrollbar_ver.set(first, last)
+
+    def scroll_rows(self, number: int):
+        self.first_row += number
+        self.render()
+
+    def yview_virtual(self, *args):
+        if args[0] == tk.MOVETO:
+            self.first_row = int(float(args[1]) * self.row_count)
+            self.render()
+        elif args[0] == tk.SCROLL:
+            number = int(args[1])
+            if args[2] == tk.PAGES:
+                number *= self.height
+            self.scroll_rows(number)
+
+    def on_mousewheel(self, event: tk.Event):
+        # Windows reports multiples of 120 per notch, macOS small deltas
+        if abs(event.delta) < 120:
+            notches = (event.delta > 0) - (event.delta < 0)
+        else:
+            notches = int(event.delta / 120)
+        self.scroll_rows(-self.WHEEL_UNITS * notches)
+        return 'break'
+
+
 class Notebook(ttk.Notebook):
     def __init__(self, frame: Union[tk.Frame, ttk.Frame]):
         super().__init__(frame)
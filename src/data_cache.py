@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+
+CACHE_DIR = Path(os.environ.get(
+    'CSVIEWER_CACHE_DIR',
+    Path.home().joinpath('.csviewer', 'cache')
+))
+CACHE_MAX_MB = int(os.environ.get('CSVIEWER_CACHE_MAX_MB', 4096))
+SUFFIX = '.feather'
+JSON_SUFFIX = '.json'
+
+
+def make_key(path: str, options: Dict) -> str:
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    identity = [path, stat.st_size, stat.st_mtime_ns, options]
+    text = json.dumps(identity, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def evict_least_recent(
+        entries: Iterable[Tuple[float, int, Path]], max_bytes: int,
+        remove: Callable[[Path], None]):
+    '''
+    Remove the least recently used of the entries (mtime, size, path)
+    until their total size is at most `max_bytes`.
+    '''
+    entries = sorted(entries)
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in entries:
+        if total <= max_bytes:
+            break
+        remove(entry)
+        total -= size
+
+
+class DataCache:
+    '''
+    On-disk cache of parsed CSV files stored as uncompressed Feather
+    (Arrow IPC), so a warm import is bounded by disk bandwidth instead of
+    CSV parsing. Entries are keyed by absolute path, size, mtime and parse
+    options; the least recently used entries are evicted above `max_bytes`.
+    '''
+    def __init__(
+            self, directory: Path = CACHE_DIR,
+            max_bytes: int = CACHE_MAX_MB * 1024 ** 2):
+
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    def get_entry_path(self, key: str) -> Path:
+        return self.directory.joinpath(f'{key}{SUFFIX}')
+
+    def load(self, key: str) -> Optional[pd.DataFrame]:
+        entry = self.get_entry_path(key)
+        if self.max_bytes <= 0 or not entry.exists():
+            return None
+        try:
+            df = pd.read_feather(entry)
+        except (ImportError, OSError, ValueError):
+            return None
+        os.utime(entry)
+        return df
+
+    def store(self, key: str, df: pd.DataFrame):
+        if self.max_bytes <= 0:
+            return
+        entry = self.get_entry_path(key)
+        temp = entry.with_suffix(f'.{threading.get_ident()}.tmp')
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            df.to_feather(temp, compression='uncompressed')
+            os.replace(temp, entry)
+        except (ImportError, OSError, TypeError, ValueError):
+            temp.unlink(missing_ok=True)
+            return
+        self.evict()
+
+    def load_json(self, key: str) -> Optional[Dict]:
+        '''
+        Small metadata stored next to the parsed frames, e.g. column
+        statistics. It is not counted against `max_bytes`.
+        '''
+        entry = self.directory.joinpath(f'{key}{JSON_SUFFIX}')
+        if self.max_bytes <= 0 or not entry.exists():
+            return None
+        try:
+            with open(entry, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store_json(self, key: str, data: Dict):
+        if self.max_bytes <= 0:
+            return
+        entry = self.directory.joinpath(f'{key}{JSON_SUFFIX}')
+        temp = entry.with_suffix(f'.{threading.get_ident()}.tmp')
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(temp, 'w') as f:
+                json.dump(data, f)
+            os.replace(temp, entry)
+        except (OSError, TypeError, ValueError):
+            temp.unlink(missing_ok=True)
+
+    def evict(self):
+        with self.lock:
+            entries = []
+            for entry in self.directory.glob(f'*{SUFFIX}'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry))
+            evict_least_recent(
+                entries, self.max_bytes, lambda entry: entry.unlink(missing_ok=True)
+            )
+
+    def clear(self):
+        for suffix in (SUFFIX, JSON_SUFFIX):
+            for entry in self.directory.glob(f'*{suffix}'):
+                entry.unlink(missing_ok=True)
+
+
+data_cache = DataCache()
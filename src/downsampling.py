@@ -0,0 +1,81 @@
+from typing import Tuple
+
+import numpy as np
+
+
+DECIMATION_METHODS = ('minmax', 'lttb', 'none')
+
+
+def as_float(values: np.ndarray) -> np.ndarray:
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.view('int64').astype('float64')
+    if np.issubdtype(values.dtype, np.number):
+        return values.astype('float64', copy=False)
+    return np.arange(len(values), dtype='float64')
+
+
+def minmax_indices(y: np.ndarray, budget: int) -> np.ndarray:
+    '''
+    Positions of the minimum and maximum of `budget // 2` equal buckets, so
+    every peak of the series survives the decimation.
+    '''
+    n = len(y)
+    buckets = max(budget // 2, 1)
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    lows = np.where(np.isnan(padded), np.inf, padded).argmin(axis=1)
+    highs = np.where(np.isnan(padded), -np.inf, padded).argmax(axis=1)
+    offsets = np.arange(buckets) * size
+    indices = np.concatenate([offsets + lows, offsets + highs, [0, n - 1]])
+    return np.unique(np.clip(indices, 0, n - 1))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, budget: int) -> np.ndarray:
+    '''
+    Largest-Triangle-Three-Buckets: one point per bucket, chosen to span the
+    largest triangle with the previously kept point and the mean of the next
+    bucket. The Python loop runs once per bucket; the work inside a bucket
+    is vectorized.
+    '''
+    n = len(y)
+    budget = max(budget, 3)
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    y_filled = np.where(np.isnan(y), 0.0, y)
+    indices = np.empty(budget, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    selected = 0
+    for bucket in range(budget - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_stop = max(edges[bucket + 2], stop + 1)
+        else:
+            next_stop = n
+        next_start = stop
+        mean_x = x[next_start:next_stop].mean()
+        mean_y = y_filled[next_start:next_stop].mean()
+        areas = np.abs(
+            (x[selected] - mean_x) * (y_filled[start:stop] - y_filled[selected])
+            - (x[selected] - x[start:stop]) * (mean_y - y_filled[selected])
+        )
+        selected = start + int(areas.argmax()) if stop > start else start
+        indices[bucket + 1] = selected
+    return np.unique(indices)
+
+
+def decimate(
+        x: np.ndarray, y: np.ndarray,
+        budget: int, method: str = 'minmax') -> Tuple[np.ndarray, np.ndarray]:
+
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if method == 'none' or not budget or len(y) <= budget:
+        return x, y
+    y_float = as_float(y)
+    if method == 'lttb':
+        indices = lttb_indices(as_float(x), y_float, budget)
+    else:
+        indices = minmax_indices(y_float, budget)
+    return x[indices], y[indices]
@@ -0,0 +1,192 @@
+'''
+Derived series from arithmetic expressions, e.g. `y * 9.81` or
+`sqrt(y1**2 + y2**2 + y3**2)`.
+
+An expression may use
+- `x` and `y`, the fields selected in its tab
+- `y1`, `y2`, ..., the y-fields selected in the other tabs
+- columns of its frame, by name when the name is an identifier, otherwise
+  quoted with backticks, e.g. `ACCELERATION(G)`
+- numbers, `+ - * / // % **`, comparisons, and the functions and
+  constants below.
+
+Expressions are parsed once and checked against a whitelist of syntax, so
+no attribute access, indexing or arbitrary calls get through, and then
+evaluated on whole NumPy columns.
+'''
+import ast
+import functools
+import re
+from typing import Dict, Mapping, Tuple
+
+import numpy as np
+
+import perf
+from fingerprint import fingerprint
+from memo import LRUCache
+
+
+FUNCTIONS = {
+    'abs': np.abs,
+    'sqrt': np.sqrt,
+    'exp': np.exp,
+    'log': np.log,
+    'log10': np.log10,
+    'sin': np.sin,
+    'cos': np.cos,
+    'tan': np.tan,
+    'arctan2': np.arctan2,
+    'hypot': np.hypot,
+    'minimum': np.minimum,
+    'maximum': np.maximum,
+    'where': np.where,
+    'cumsum': np.cumsum,
+    'diff': lambda values: np.diff(values, prepend=np.nan),
+}
+CONSTANTS = {
+    'pi': np.pi,
+    'e': np.e,
+    'g': 9.80665,
+}
+ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call,
+    ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.UAdd, ast.USub,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+QUOTED_NAME = re.compile(r'`([^`]*)`')
+QUOTED_PREFIX = '_column_'
+CACHE_SIZE = 32
+
+
+class Error(Exception):
+    '''Base class for exceptions in this module.'''
+    message = 'Invalid expression.'
+
+    def __init__(self, detail: str = ''):
+        super().__init__(detail)
+        if detail:
+            self.message = f'{self.message}\n{detail}'
+
+
+class SyntaxNotAllowedError(Error):
+    '''Exception raised when an expression uses syntax out of the whitelist.'''
+    message = 'The expression uses syntax which is not allowed.'
+
+
+class UnknownNameError(Error):
+    '''Exception raised when an expression uses an unknown name.'''
+    message = 'The expression uses a name which is neither a column nor a function.'
+
+
+class EvaluationError(Error):
+    '''Exception raised when evaluating an expression failed.'''
+    message = 'The expression cannot be evaluated.'
+
+
+class FloatConstants(ast.NodeTransformer):
+    '''
+    Integer constants become floats, so powers of constants overflow
+    instead of building huge Python integers.
+    '''
+    def visit_Constant(self, node: ast.Constant) -> ast.Constant:
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise SyntaxNotAllowedError(repr(node.value))
+        return ast.copy_location(ast.Constant(float(node.value)), node)
+
+
+class Expression:
+    def __init__(self, text: str):
+        self.text = text
+        self.quoted: Dict[str, str] = {}
+        source = QUOTED_NAME.sub(self.replace_quoted, text)
+        try:
+            tree = ast.parse(source.strip(), mode='eval')
+        except SyntaxError as e:
+            raise SyntaxNotAllowedError(e.msg)
+        for node in ast.walk(tree):
+            if not isinstance(node, ALLOWED_NODES):
+                raise SyntaxNotAllowedError(type(node).__name__)
+            if isinstance(node, ast.Call):
+                if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+                    raise SyntaxNotAllowedError(ast.unparse(node.func))
+                if node.keywords:
+                    raise SyntaxNotAllowedError('keyword arguments')
+        tree = ast.fix_missing_locations(FloatConstants().visit(tree))
+        self.code = compile(tree, '<expression>', 'eval')
+        called = {
+            node.func.id for node in ast.walk(tree) if isinstance(node, ast.Call)
+        }
+        self.names = tuple(dict.fromkeys(
+            node.id for node in ast.walk(tree)
+            if isinstance(node, ast.Name) and node.id not in called
+            and node.id not in CONSTANTS
+        ))
+
+    def replace_quoted(self, match: re.Match) -> str:
+        name = f'{QUOTED_PREFIX}{len(self.quoted)}'
+        self.quoted[name] = match.group(1)
+        return name
+
+    def get_column_name(self, name: str) -> str:
+        return self.quoted.get(name, name)
+
+    def evaluate(self, values: Mapping[str, np.ndarray]) -> np.ndarray:
+        namespace = {'__builtins__': {}, **FUNCTIONS, **CONSTANTS, **values}
+        try:
+            with np.errstate(all='ignore'):
+                return np.asarray(eval(self.code, namespace))
+        except (ArithmeticError, TypeError, ValueError) as e:
+            raise EvaluationError(str(e))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def compile_expression(text: str) -> Expression:
+    return Expression(text)
+
+
+evaluation_cache = LRUCache(CACHE_SIZE)
+
+
+def resolve_names(
+        expression: Expression, df, variables: Mapping[str, np.ndarray]
+        ) -> Dict[str, np.ndarray]:
+    '''
+    Arrays for the names of an expression: variables first, then columns of
+    `df`. Only the columns used are read, which matters for lazy frames.
+    '''
+    values = {}
+    for name in expression.names:
+        column = expression.get_column_name(name)
+        if name in variables:
+            values[name] = np.asarray(variables[name])
+        elif column in df.columns:
+            values[name] = np.asarray(df[column])
+        else:
+            raise UnknownNameError(column)
+    return values
+
+
+@perf.timed(category='plot')
+def evaluate(
+        text: str, df, variables: Mapping[str, np.ndarray],
+        length: int) -> np.ndarray:
+    '''
+    Float array of `length` values of the expression `text`, memoized by
+    the expression, the length and the content of the arrays it uses.
+    '''
+    expression = compile_expression(text)
+    values = resolve_names(expression, df, variables)
+    key: Tuple[str, int, str] = (text, length, fingerprint(*values.values()))
+    result = evaluation_cache.get(key)
+    if result is not None:
+        return result
+    perf.count(rows=length)
+    result = expression.evaluate(values)
+    try:
+        result = np.broadcast_to(result, (length,)).astype('float64')
+    except (TypeError, ValueError) as e:
+        raise EvaluationError(str(e))
+    evaluation_cache.put(key, result)
+    return result
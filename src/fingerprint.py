@@ -0,0 +1,45 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from memo import LRUCache
+
+
+DIGEST_SIZE = 16
+MEMO_SIZE = 256
+
+# digests by buffer address; an entry keeps its array alive, so the
+# address cannot be reused by another array while the entry exists
+digests = LRUCache(MEMO_SIZE)
+
+
+def hash_array(array: np.ndarray) -> str:
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    digest.update(f'{array.dtype.str}{array.shape}'.encode())
+    if array.dtype == object:
+        array = pd.util.hash_array(array.ravel())
+    digest.update(np.ascontiguousarray(array).data)
+    return digest.hexdigest()
+
+
+def fingerprint(*arrays: np.ndarray) -> str:
+    '''
+    Digest of the contents of arrays, used as a cache key for results
+    derived from them. Equal data gives equal keys, whichever frame or
+    copy it comes from. The columns of loaded frames are never modified
+    in place, so the digest of a buffer is computed once and memoized.
+    '''
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for array in arrays:
+        array = np.asarray(array)
+        key = (
+            array.__array_interface__['data'][0], array.dtype.str,
+            array.shape, array.strides
+        )
+        memo = digests.get(key)
+        if memo is None:
+            memo = (array, hash_array(array))
+            digests.put(key, memo)
+        digest.update(memo[1].encode())
+    return digest.hexdigest()
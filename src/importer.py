@@ -0,0 +1,95 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+import column_stats
+import compact
+import csv_reader
+
+
+class ImportJob:
+    '''
+    Parse several CSV files on a worker pool, one file per worker, so the
+    GUI stays responsive: it polls `progress` and `pop_finished` from the
+    Tk main loop and never blocks on a worker. Only tokenizing and
+    decompressing release the GIL, so files are parsed partly in parallel.
+
+    With `compact`, frames held in memory are downcast after parsing and
+    `sizes` keeps their memory before and after. `stats` holds the column
+    statistics of every file which was fully loaded. `offsets` is where
+    following a file starts: after its last newline. A last line without
+    one is parsed too, and `unterminated` tells the tail to replace it.
+    '''
+    def __init__(
+            self, csv_paths: Dict[str, str], mode: str = 'memory',
+            max_workers: int = None, compact: bool = False):
+
+        self.csv_paths = csv_paths
+        self.mode = mode
+        self.compact = compact
+        self.sizes: Dict[str, Tuple[int, int]] = {}
+        self.stats: Dict[str, column_stats.StatsAccumulator] = {}
+        self.cancel_event = threading.Event()
+        self.progress: Dict[str, float] = {name: 0.0 for name in csv_paths}
+        self.offsets: Dict[str, int] = {}
+        self.unterminated: Dict[str, bool] = {}
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or os.cpu_count()
+        )
+        self.futures: Dict[str, Future] = {
+            name: self.executor.submit(self.load, name, path)
+            for name, path in csv_paths.items()
+        }
+        self.collected = set()
+
+    def load(self, name: str, path: str) -> pd.DataFrame:
+        def report(fraction: float):
+            self.progress[name] = fraction
+
+        # rows appended during the import are left to the tail, which
+        # starts after the last complete line
+        size = os.path.getsize(path)
+        dataframe = csv_reader.load_csv(
+            path, self.mode, progress=report, cancel=self.cancel_event,
+            limit=size
+        )
+        self.offsets[name] = csv_reader.get_complete_size(path, size)
+        self.unterminated[name] = self.offsets[name] < size
+        if self.compact and self.mode == 'memory':
+            dataframe, before, after = compact.compact_dataframe(dataframe)
+            self.sizes[name] = (before, after)
+        if isinstance(dataframe, pd.DataFrame):
+            self.stats[name] = column_stats.get_stats(path, dataframe)
+        return dataframe
+
+    def pop_finished(self) -> List[Tuple[str, Future]]:
+        finished = []
+        for name, future in self.futures.items():
+            if name not in self.collected and future.done():
+                self.collected.add(name)
+                finished.append((name, future))
+        if not self.is_running():
+            self.executor.shutdown(wait=False)
+        return finished
+
+    def wait(self) -> List[pd.DataFrame]:
+        '''
+        Block until every file is loaded and return the frames in the order
+        of `csv_paths`. The first failure is raised.
+        '''
+        try:
+            return [future.result() for future in self.futures.values()]
+        finally:
+            self.executor.shutdown(wait=False)
+
+    def is_running(self) -> bool:
+        return len(self.collected) < len(self.futures)
+
+    def cancel(self):
+        self.cancel_event.set()
+        for future in self.futures.values():
+            future.cancel()
+        self.executor.shutdown(wait=False)
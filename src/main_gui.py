@@ -1,16 +1,29 @@
-import csv
+'''
+pandas, matplotlib and the modules built on them are imported where they
+are first used, so the window opens before they are loaded.
+'''
+from __future__ import annotations
+
 import tkinter as tk
 from pathlib import Path
 from tkinter import font
 from tkinter import filedialog
 from tkinter import ttk
-from typing import Dict, Sequence, TypedDict, Union
-
-import pandas as pd
+from typing import TYPE_CHECKING, Callable, Dict, List, Sequence, TypedDict, Union
 
-import plotting
+import perf
 from custom_widgets import *
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+    import column_stats
+    import csv_reader
+    import importer
+    import plotting
+    import row_filter
+    import tail
+
 
 class AxisVisualWidgets(TypedDict):
     label: tk.Entry
@@ -26,6 +39,14 @@ class FigureVisualWidgets(TypedDict):
     height: tk.DoubleVar
     grid_visible: tk.IntVar
     legend_visible: tk.IntVar
+    point_budget: tk.IntVar
+    decimation: ttk.Combobox
+
+
+class ImportOptionWidgets(TypedDict):
+    mode: ttk.Combobox
+    follow: tk.IntVar
+    compact: tk.IntVar
 
 
 class DataVisualWidgets(TypedDict):
@@ -33,6 +54,8 @@ class DataVisualWidgets(TypedDict):
     field_x: ttk.Combobox
     field_y: ttk.Combobox
     label: tk.Entry
+    series: ttk.Combobox
+    expression: tk.Entry
 
 
 TabName = str
@@ -44,7 +67,7 @@ class DataVisualTab(ttk.Frame):
         self.widgets: DataVisualWidgets = {}
 
 
-DataPool = Dict[TabName, pd.DataFrame]
+DataPool = Dict[TabName, Union['pd.DataFrame', 'csv_reader.LazyFrame']]
 
 
 class DataVisualNotebook(Notebook):
@@ -82,6 +105,19 @@ class DataVisualNotebook(Notebook):
         label.grid(row=3, column=0, sticky=tk.W, **App.PADS)
         entry.grid(row=3, column=1, sticky=tk.W, **App.PADS)
         widgets['label'] = entry
+
+        label = tk.Label(tab, text='Series: ')
+        combobox = ttk.Combobox(tab, width=App.WIDTH_COMBOBOX)
+        label.grid(row=4, column=0, sticky=tk.W, **App.PADS)
+        combobox.grid(row=4, column=1, sticky=tk.W, **App.PADS)
+        combobox.config(state='readonly')
+        widgets['series'] = combobox
+
+        label = tk.Label(tab, text='Expression: ')
+        entry = tk.Entry(tab, width=App.WIDTH_ENTRY)
+        label.grid(row=5, column=0, sticky=tk.W, **App.PADS)
+        entry.grid(row=5, column=1, sticky=tk.W, **App.PADS)
+        widgets['expression'] = entry
         tab.widgets = widgets
 
     def update_fieldname_options(self, tabname: TabName, data_pool: DataPool):
@@ -93,8 +129,17 @@ class DataVisualNotebook(Notebook):
         widgets['field_y'].config(values=columns)
         widgets['field_y'].current(1)
 
+    def update_csv_options(self, data_pool: DataPool):
+        values_csv_idx = list(data_pool.keys())
+        for tab in self.tabs_.values():
+            tab.widgets['csv_idx'].config(values=values_csv_idx)
+
     def initialize_widgets(self, tabname: TabName, data_pool: DataPool):
+        import spectra
+
         widgets = self.tabs_[tabname].widgets
+        widgets['series'].config(values=spectra.SERIES_KINDS)
+        widgets['series'].current(0)
         values_csv_idx = list(data_pool.keys())
         widgets['csv_idx'].config(values=values_csv_idx)
         widgets['csv_idx'].current(0)
@@ -105,21 +150,85 @@ class DataVisualNotebook(Notebook):
         )
 
 
+class FilterWidgets(TypedDict):
+    entry: tk.Entry
+    count: tk.Label
+
+
 class DataPoolNotebook(Notebook):
     def __init__(self, frame: Union[tk.Frame, ttk.Frame]):
         super().__init__(frame)
+        self.treeviews: Dict[TabName, VirtualTreeview] = {}
+        self.filters: Dict[TabName, row_filter.RowFilter] = {}
+        self.filter_widgets: Dict[TabName, FilterWidgets] = {}
 
     def present_data_pool(self, datapool: DataPool):
         for tabname, dataframe in datapool.items():
-            self.create_new_empty_tab(tabname)
-            tab = self.tabs_[tabname]
-            columns = list(dataframe.columns)
-            treeview = Treeview(tab, columns, App.HEIGHT_DATAPOOL)
-            treeview.insert_dataframe(dataframe)
-            treeview.adjust_column_width()
+            self.present_dataframe(tabname, dataframe)
+
+    def present_dataframe(
+            self, tabname: TabName,
+            dataframe: Union[pd.DataFrame, csv_reader.LazyFrame]):
+
+        import csv_reader
+        import row_filter
+
+        if isinstance(dataframe, csv_reader.LazyFrame):
+            dataframe = dataframe.preview
+        self.create_new_empty_tab(tabname)
+        tab = self.tabs_[tabname]
+        self.fill_filter_widgets(tabname)
+        columns = list(dataframe.columns)
+        treeview = VirtualTreeview(tab, columns, App.HEIGHT_DATAPOOL)
+        treeview.set_dataframe(dataframe)
+        treeview.adjust_column_width()
+        self.treeviews[tabname] = treeview
+        self.filters[tabname] = row_filter.RowFilter(dataframe)
+
+    def fill_filter_widgets(self, tabname: TabName):
+        frame = tk.Frame(self.tabs_[tabname])
+        frame.pack(side=tk.TOP, fill=tk.X)
+        label = tk.Label(frame, text='Filter: ')
+        label.pack(side=tk.LEFT, **App.PADS)
+        entry = tk.Entry(frame)
+        entry.pack(side=tk.LEFT, fill=tk.X, expand=True, **App.PADS)
+        entry.bind('<Return>', lambda event: self.apply_filter(tabname))
+        count = tk.Label(frame)
+        count.pack(side=tk.LEFT, **App.PADS)
+        self.filter_widgets[tabname] = {'entry': entry, 'count': count}
+
+    def apply_filter(self, tabname: TabName):
+        import row_filter
+
+        widgets = self.filter_widgets[tabname]
+        treeview = self.treeviews[tabname]
+        try:
+            predicates = row_filter.parse_filter(
+                widgets['entry'].get(), treeview.dataframe.columns
+            )
+            rows = self.filters[tabname].apply(predicates)
+        except row_filter.Error as e:
+            tk.messagebox.showerror(title='Error', message=e.message)
+            return
+        treeview.set_rows(rows)
+        self.show_filter_count(tabname)
+
+    def show_filter_count(self, tabname: TabName):
+        rows = self.filters[tabname].rows
+        total = len(self.treeviews[tabname].dataframe)
+        text = '' if rows is None else f'{len(rows)} of {total} rows'
+        self.filter_widgets[tabname]['count'].config(text=text)
+
+    def update_dataframe(self, tabname: TabName, dataframe: pd.DataFrame):
+        rows = self.filters[tabname].extend(dataframe)
+        self.treeviews[tabname].update_dataframe(dataframe, rows)
+        self.show_filter_count(tabname)
 
     def clear_content(self):
         self.remove_all_tabs()
+        self.treeviews = {}
+        self.filters = {}
+        self.filter_widgets = {}
         tabname = '1'
         self.create_new_empty_tab(tabname)
         tab = self.tabs_[tabname]
@@ -130,30 +239,201 @@ class CsvInfoTreeview(Treeview):
     def __init__(self, frame: Union[tk.Frame, ttk.Frame], columns: Sequence[str], height: int):
         super().__init__(frame, columns, height)
 
-    def collect_data_pool(self) -> DataPool:
-        data_pool: DataPool = {}
+    def collect_csv_paths(self) -> Dict[TabName, str]:
+        csv_paths: Dict[TabName, str] = {}
         csv_info = self.get_dataframe()
         for row in csv_info.itertuples():
-            csv_idx, csv_path = row[1:]
-            tabname = str(csv_idx)
-            if self.check_header(csv_path):
-                csv_dataframe = pd.read_csv(csv_path)
-            else:
-                csv_dataframe = pd.read_csv(csv_path, header=None)
-                columns = [f'column-{col}' for col in csv_dataframe.columns]
-                csv_dataframe.columns = columns
-            data_pool[tabname] = csv_dataframe
-        return data_pool
+            csv_idx, csv_path = row[1:3]
+            csv_paths[str(csv_idx)] = csv_path
+        return csv_paths
+
+    def set_status(self, tabname: TabName, status: str):
+        for line in self.get_children():
+            values = self.item(line)['values']
+            if str(values[0]) == tabname:
+                self.set(line, 'Status', status)
 
     def check_header(self, csv_path: str):
-        with open(csv_path, 'r') as f:
-            has_header = csv.Sniffer().has_header(f.read())
-            return has_header
+        import csv_reader
+
+        return csv_reader.schema_cache.get(csv_path)['has_header']
+
+
+class PerfPanel(tk.Toplevel):
+    '''
+    Stages recorded by `perf`, newest first. The table is refreshed while
+    the window is open.
+    '''
+    COLUMNS = (
+        'Stage', 'Category', 'Wall (ms)', 'CPU (ms)',
+        'Rows', 'Data (MiB)', 'Peak (MiB)'
+    )
+    HEIGHT = 20
+    MAX_ROWS = 500
+    REFRESH_INTERVAL = 500
+
+    def __init__(self, root: tk.Tk):
+        super().__init__(root)
+        self.title('Performance')
+        subframe = tk.Frame(self)
+        subframe.pack(side=tk.TOP, fill=tk.X)
+        self.record = tk.IntVar(value=int(perf.recorder.enabled))
+        checkbutton = tk.Checkbutton(
+            subframe,
+            text='Record',
+            variable=self.record,
+            command=lambda: self.toggle_record()
+        )
+        checkbutton.pack(side=tk.LEFT, **App.PADS)
+        self.trace_memory = tk.IntVar(value=int(perf.recorder.trace_memory))
+        checkbutton = tk.Checkbutton(
+            subframe,
+            text='Trace memory',
+            variable=self.trace_memory,
+            command=lambda: self.toggle_trace_memory()
+        )
+        checkbutton.pack(side=tk.LEFT, **App.PADS)
+        button = tk.Button(
+            subframe,
+            text='Export trace',
+            command=lambda: self.export_trace(),
+        )
+        button.pack(side=tk.RIGHT, **App.PADS)
+        button = tk.Button(
+            subframe,
+            text='Clear',
+            command=lambda: self.clear(),
+        )
+        button.pack(side=tk.RIGHT, **App.PADS)
+        self.render_cache_label = tk.Label(subframe)
+        self.render_cache_label.pack(side=tk.RIGHT, **App.PADS)
+
+        subframe = tk.Frame(self)
+        subframe.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.treeview = Treeview(subframe, PerfPanel.COLUMNS, PerfPanel.HEIGHT)
+        self.latest: perf.StageRecord = None
+        self.refresh()
+
+    def toggle_record(self):
+        perf.recorder.enabled = bool(self.record.get())
+
+    def toggle_trace_memory(self):
+        perf.recorder.set_trace_memory(bool(self.trace_memory.get()))
+
+    def clear(self):
+        perf.recorder.clear()
+        self.latest = None
+        self.treeview.clear_content()
+
+    def export_trace(self):
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            title='Export trace',
+            defaultextension='.json',
+            filetypes=[('Chrome trace', '*.json')]
+        )
+        if path:
+            perf.recorder.export_chrome_trace(path)
+
+    def refresh(self):
+        import pandas as pd
+
+        import render_cache
+
+        if not self.winfo_exists():
+            return
+        stats = render_cache.render_cache.get_stats()
+        self.render_cache_label.config(text=(
+            f"Render cache: {stats['lookups'] - stats['misses']} of "
+            f"{stats['lookups']} hits ({stats['hit_rate']:.0%})"
+        ))
+        records = perf.recorder.get_records()
+        if records and records[-1] is not self.latest:
+            self.latest = records[-1]
+            rows = [
+                [
+                    record['name'],
+                    record['category'],
+                    f"{record['wall'] * 1e3:.1f}",
+                    f"{record['cpu'] * 1e3:.1f}",
+                    record['rows'],
+                    f"{record['bytes'] / 1024 ** 2:.1f}",
+                    f"{record['peak_bytes'] / 1024 ** 2:.1f}",
+                ]
+                for record in reversed(records[-PerfPanel.MAX_ROWS:])
+            ]
+            table = pd.DataFrame(rows, columns=PerfPanel.COLUMNS)
+            self.treeview.clear_content()
+            self.treeview.insert_dataframe(table)
+            self.treeview.adjust_column_width(table)
+        self.master.after(PerfPanel.REFRESH_INTERVAL, self.refresh)
+
+
+class StatsPanel(tk.Toplevel):
+    '''
+    Column statistics of the imported files.
+    '''
+    COLUMNS = (
+        'CSV ID', 'Column', 'Dtype', 'Min', 'Max',
+        'NaN', 'Monotonic', 'Positive'
+    )
+    HEIGHT = 20
+
+    def __init__(
+            self, root: tk.Tk,
+            stats: Dict[TabName, Dict[str, column_stats.ColumnStats]]):
+
+        import pandas as pd
+
+        super().__init__(root)
+        self.title('Column statistics')
+        rows = []
+        for tabname, columns in stats.items():
+            for column, column_stat in columns.items():
+                rows.append([
+                    tabname,
+                    column,
+                    column_stat['dtype'],
+                    format_number(column_stat['min']),
+                    format_number(column_stat['max']),
+                    column_stat['nan_count'],
+                    describe_monotonic(column_stat),
+                    'yes' if column_stat['is_positive'] else 'no',
+                ])
+        table = pd.DataFrame(rows, columns=StatsPanel.COLUMNS)
+        subframe = tk.Frame(self)
+        subframe.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        treeview = Treeview(subframe, StatsPanel.COLUMNS, StatsPanel.HEIGHT)
+        treeview.insert_dataframe(table)
+        treeview.adjust_column_width(table)
+
+
+def set_entry(entry: tk.Entry, value):
+    state = entry.cget('state')
+    entry.config(state='normal')
+    entry.delete(0, tk.END)
+    entry.insert(0, str(value))
+    entry.config(state=state)
+
+
+def format_number(value: float) -> str:
+    return '' if value is None else f'{value:.6g}'
+
+
+def describe_monotonic(column_stat: column_stats.ColumnStats) -> str:
+    if column_stat['is_increasing'] and column_stat['is_decreasing']:
+        return 'constant'
+    if column_stat['is_increasing']:
+        return 'increasing'
+    if column_stat['is_decreasing']:
+        return 'decreasing'
+    return 'no'
 
 
 class ConfigWidgets(TypedDict):
     csv_info: CsvInfoTreeview
     data_pool: DataPoolNotebook
+    import_options: ImportOptionWidgets
     data_visual: DataVisualNotebook
     dataset_number: Spinbox
     figure_visual: FigureVisualWidgets
@@ -186,8 +466,12 @@ class App:
     }
     HEIGHT_FILENAMES = 5
     HEIGHT_DATAPOOL = 28
+    IMPORT_POLL_INTERVAL = 100
     WIDTH_COMBOBOX = 12
     WIDTH_ENTRY = 14
+    POINT_BUDGET = 4000
+    FIGURE_SIZE = (4.8, 2.4)
+    FOLLOW_INTERVAL = 1000
 
     # typesetting
     def __init__(self):
@@ -195,19 +479,45 @@ class App:
         self.font_label = font.Font(family='Helvetica', size=10)
         self.font_button = font.Font(family='Helvetica', size=10)
         self.config_widgets = self.initialize_configuration_widgets()
+        self.figure_presenter: plotting.FigurePresenter = None
+        self.stats: Dict[TabName, column_stats.StatsAccumulator] = {}
+        self.stats_panel: StatsPanel = None
+        self.is_ready = False
+        # buttons whose actions need the lazily built frames
+        self.pending_buttons: List[tk.Button] = []
         self.create_frame_for_csv_info()
-        self.create_frame_for_data_pool()
         self.create_frame_for_data_visual()
-        self.create_frame_for_figure_visual()
         self.create_frame_for_axis_visual_x()
         self.create_frame_for_axis_visual_y()
         self.create_frame_for_plot()
+        self.root.after_idle(self.create_frames_lazily, [
+            self.create_frame_for_data_pool,
+            self.create_frame_for_figure_visual,
+            self.create_frame_for_figure,
+        ])
+
+    def run(self):
         self.root.mainloop()
 
+    def create_frames_lazily(self, builders: List[Callable[[], None]]):
+        '''
+        Build the frames which need pandas, numpy or matplotlib one per idle
+        callback, after the window has been drawn, then enable the buttons
+        which use them.
+        '''
+        if not builders:
+            for button in self.pending_buttons:
+                button.config(state='normal')
+            self.is_ready = True
+            return
+        builders[0]()
+        self.root.after_idle(self.create_frames_lazily, builders[1:])
+
     def initialize_configuration_widgets(self) -> ConfigWidgets:
         config_widgets: ConfigWidgets = {
             'csv_info': None,
             'data_pool': None,
+            'import_options': ImportOptionWidgets(),
             'dataset_number': None,
             'data_visual': None,
             'figure_visual': FigureVisualWidgets(),
@@ -224,6 +534,7 @@ class App:
         root.columnconfigure(0, weight=1)
         root.columnconfigure(1, weight=1)
         root.columnconfigure(2, weight=1)
+        root.columnconfigure(3, weight=3)
         root.rowconfigure(0, weight=1)
         root.rowconfigure(1, weight=5)
         root.rowconfigure(2, weight=5)
@@ -241,7 +552,7 @@ class App:
 
         subframe = tk.Frame(frame)
         subframe.grid(row=0, column=0, sticky=tk.NSEW)
-        columns = ('CSV ID', 'CSV Path')
+        columns = ('CSV ID', 'CSV Path', 'Status')
         treeview = CsvInfoTreeview(subframe, columns, App.HEIGHT_FILENAMES)
 
         subframe = tk.Frame(frame)
@@ -250,22 +561,59 @@ class App:
             subframe,
             text='Choose',
             command=lambda: self.open_files(),
-            width=6
+            width=6,
+            state='disabled'
         )
+        self.pending_buttons.append(button)
         button.grid(row=0, column=0, **App.PADS)
         button['font'] = self.font_button
+
+        button = tk.Button(
+            subframe,
+            text='Cancel',
+            command=lambda: self.cancel_import(),
+            width=6
+        )
+        button.grid(row=1, column=0, **App.PADS)
+        button['font'] = self.font_button
+
+        button = tk.Button(
+            subframe,
+            text='Open',
+            command=lambda: self.open_session(),
+            width=6,
+            state='disabled'
+        )
+        self.pending_buttons.append(button)
+        button.grid(row=0, column=1, **App.PADS)
+        button['font'] = self.font_button
+
+        button = tk.Button(
+            subframe,
+            text='Save',
+            command=lambda: self.save_session(),
+            width=6,
+            state='disabled'
+        )
+        self.pending_buttons.append(button)
+        button.grid(row=1, column=1, **App.PADS)
+        button['font'] = self.font_button
         self.config_widgets['csv_info'] = treeview
+        self.session_state: Dict = None
 
     def create_frame_for_data_pool(self):
+        import csv_reader
+
         frame = tk.LabelFrame(self.root, text='Review CSV data')
         frame.grid(row=1, column=0, rowspan=3, sticky=tk.NSEW, **App.PADS)
         frame.rowconfigure(0, weight=1)
         frame.columnconfigure(0, weight=1)
         frame.columnconfigure(1, weight=1)
+        frame.columnconfigure(2, weight=1)
         frame['font'] = self.font_label
 
         notebook = DataPoolNotebook(frame)
-        notebook.grid(row=0, column=0, columnspan=2, sticky=tk.NSEW)
+        notebook.grid(row=0, column=0, columnspan=3, sticky=tk.NSEW)
 
         tabname = '1'
         notebook.create_new_empty_tab(tabname=tabname)
@@ -289,8 +637,51 @@ class App:
         )
         button.grid(row=1, column=1, **App.PADS)
         button['font'] = self.font_button
+
+        button = tk.Button(
+            frame,
+            text='Stats',
+            command=lambda: self.show_stats_panel(),
+            width=6
+        )
+        button.grid(row=1, column=2, **App.PADS)
+        button['font'] = self.font_button
         self.config_widgets['data_pool'] = notebook
 
+        widgets = self.config_widgets['import_options']
+        subframe = tk.Frame(frame)
+        subframe.grid(row=2, column=0, columnspan=3, sticky=tk.W)
+
+        label = tk.Label(subframe, text='Import mode: ')
+        combobox = ttk.Combobox(subframe, width=App.WIDTH_COMBOBOX)
+        label.grid(row=0, column=0, sticky=tk.W, **App.PADS)
+        combobox.grid(row=0, column=1, sticky=tk.W, **App.PADS)
+        combobox.config(values=csv_reader.IMPORT_MODES, state='readonly')
+        combobox.current(0)
+        widgets['mode'] = combobox
+
+        intvar = tk.IntVar()
+        checkbutton = tk.Checkbutton(
+            subframe,
+            text='Follow',
+            variable=intvar,
+            command=self.toggle_follow
+        )
+        checkbutton.grid(row=0, column=2, sticky=tk.W, **App.PADS)
+        widgets['follow'] = intvar
+
+        intvar = tk.IntVar()
+        checkbutton = tk.Checkbutton(
+            subframe,
+            text='Compact',
+            variable=intvar
+        )
+        checkbutton.grid(row=0, column=3, sticky=tk.W, **App.PADS)
+        widgets['compact'] = intvar
+        self.tails: Dict[TabName, tail.CsvTail] = {}
+        self.appendables: Dict[TabName, tail.AppendableFrame] = {}
+        self.is_following = False
+
     def create_frame_for_data_visual(self):
         frame = tk.LabelFrame(self.root, text='Data Visualization')
         frame.grid(row=1, column=1, sticky=tk.NSEW, **App.PADS)
@@ -317,6 +708,8 @@ class App:
         self.config_widgets['dataset_number'] = spinbox
 
     def create_frame_for_figure_visual(self):
+        import downsampling
+
         widgets = self.config_widgets['figure_visual']
         frame = tk.LabelFrame(self.root, text='Figure Visualization')
         frame.grid(row=2, column=1, sticky=tk.NSEW, **App.PADS)
@@ -369,6 +762,25 @@ class App:
         intvar.set(True)
         widgets['legend_visible'] = intvar
 
+        intvar = tk.IntVar()
+        label = tk.Label(frame, text='Points: ')
+        entry = tk.Entry(frame, width=8, textvariable=intvar)
+        label.grid(row=4, column=0, sticky=tk.W, **App.PADS)
+        entry.grid(row=4, column=1, sticky=tk.W, **App.PADS)
+        intvar.set(App.POINT_BUDGET)
+        widgets['point_budget'] = intvar
+
+        label = tk.Label(frame, text='Method: ')
+        combobox = ttk.Combobox(frame, width=8)
+        label.grid(row=4, column=2, sticky=tk.W, **App.PADS)
+        combobox.grid(row=4, column=3, sticky=tk.W, **App.PADS)
+        combobox.config(
+            values=downsampling.DECIMATION_METHODS,
+            state='readonly'
+        )
+        combobox.current(0)
+        widgets['decimation'] = combobox
+
     def create_frame_for_axis_visual_x(self):
         widgets = self.config_widgets['axis_x']
         frame = tk.LabelFrame(self.root, text='X-Axis Visualization')
@@ -480,13 +892,16 @@ class App:
         frame.grid(row=3, column=1, columnspan=2, sticky=tk.NSEW, **App.PADS)
         frame.columnconfigure(0, weight=1)
         frame.columnconfigure(1, weight=1)
+        frame.columnconfigure(2, weight=1)
 
         button = tk.Button(
             frame,
             text='Plot',
             command=lambda: self.plot(),
-            width=6
+            width=6,
+            state='disabled'
         )
+        self.pending_buttons.append(button)
         button.grid(row=0, column=0, **App.PADS,)
         button['font'] = self.font_button
 
@@ -499,23 +914,60 @@ class App:
         button.grid(row=0, column=1, **App.PADS)
         button['font'] = self.font_button
 
+        button = tk.Button(
+            frame,
+            text='Perf',
+            command=lambda: self.show_perf_panel(),
+            width=6
+        )
+        button.grid(row=0, column=2, **App.PADS)
+        button['font'] = self.font_button
+        self.perf_panel: PerfPanel = None
+
+    def create_frame_for_figure(self):
+        from matplotlib.backends.backend_tkagg import (
+            FigureCanvasTkAgg, NavigationToolbar2Tk
+        )
+        from matplotlib.figure import Figure
+
+        import plotting
+
+        frame = tk.LabelFrame(self.root, text='Figure')
+        frame.grid(row=0, column=3, rowspan=4, sticky=tk.NSEW, **App.PADS)
+        frame['font'] = self.font_label
+
+        fig = Figure(figsize=App.FIGURE_SIZE, tight_layout=True)
+        canvas = FigureCanvasTkAgg(fig, master=frame)
+        toolbar = NavigationToolbar2Tk(canvas, frame, pack_toolbar=False)
+        toolbar.pack(side=tk.BOTTOM, fill=tk.X)
+        canvas.get_tk_widget().pack(side=tk.TOP, anchor=tk.NW)
+        self.figure_presenter = plotting.FigurePresenter(fig)
+
     # actions
     def open_files(self):
+        import pandas as pd
+
+        import csv_reader
+
         treeview_csv_info = self.config_widgets['csv_info']
         notebook_data_pool = self.config_widgets['data_pool']
         notebook_data_visual = self.config_widgets['data_visual']
         spinbox_dataset = self.config_widgets['dataset_number']
+        self.cancel_import()
         treeview_csv_info.clear_content()
         csv_paths = filedialog.askopenfilenames(
             title='Choose csv files',
-            filetypes=[('csv files', '*.csv')]
+            filetypes=[
+                ('csv files', ' '.join(csv_reader.CSV_PATTERNS)),
+                ('all files', '*'),
+            ]
         )
         csv_info = pd.DataFrame(
-            [[idx + 1, path] for idx, path in enumerate(csv_paths)],
-            columns=['CSV ID', 'CSV Path']
+            [[idx + 1, path, ''] for idx, path in enumerate(csv_paths)],
+            columns=['CSV ID', 'CSV Path', 'Status']
         )
         treeview_csv_info.insert_dataframe(csv_info)
-        treeview_csv_info.adjust_column_width()
+        treeview_csv_info.adjust_column_width(csv_info)
         notebook_data_pool.clear_content()
         notebook_data_visual.remove_all_tabs()
         notebook_data_visual.create_new_empty_tab('1')
@@ -533,29 +985,232 @@ class App:
             if self.data_pool == {}:
                 raise EmptyDataPoolError
 
+    @perf.timed(category='gui')
     def import_csv(self):
         try:
             self.check_csv_chosen()
         except NoCsvError as e:
             tk.messagebox.showerror(title='Error', message=e.message)
         else:
+            self.cancel_import()
             treeview_csv_info = self.config_widgets['csv_info']
             notebook_data_pool = self.config_widgets['data_pool']
             notebook_data_visual = self.config_widgets['data_visual']
             spinbox_dataset = self.config_widgets['dataset_number']
-            self.data_pool = treeview_csv_info.collect_data_pool()
+            csv_paths = treeview_csv_info.collect_csv_paths()
+            for tabname in csv_paths:
+                treeview_csv_info.set_status(tabname, 'queued')
+            self.reset_data_pool()
             notebook_data_pool.remove_all_tabs()
-            notebook_data_pool.present_data_pool(self.data_pool)
             notebook_data_visual.remove_all_tabs()
             notebook_data_visual.create_new_empty_tab('1')
             notebook_data_visual.fill_data_visual_widgets('1')
-            notebook_data_visual.initialize_widgets('1', self.data_pool)
             spinbox_dataset.stringvar.set(1)
+            import importer
+
+            widgets = self.config_widgets['import_options']
+            self.import_job = importer.ImportJob(
+                csv_paths, widgets['mode'].get(),
+                compact=bool(widgets['compact'].get())
+            )
+            self.poll_import(self.import_job)
+
+    def poll_import(self, job: importer.ImportJob):
+        import csv_reader
+
+        if job is not self.import_job:
+            return
+        treeview_csv_info = self.config_widgets['csv_info']
+        for tabname, future in job.pop_finished():
+            if future.cancelled():
+                treeview_csv_info.set_status(tabname, 'cancelled')
+            elif isinstance(future.exception(), csv_reader.ImportCancelledError):
+                treeview_csv_info.set_status(tabname, 'cancelled')
+            elif future.exception() is not None:
+                treeview_csv_info.set_status(
+                    tabname, f'failed: {future.exception()}'
+                )
+            else:
+                status = self.get_done_status(tabname, job)
+                treeview_csv_info.set_status(tabname, status)
+                if tabname in job.stats:
+                    self.stats[tabname] = job.stats[tabname]
+                self.add_to_data_pool(tabname, future.result())
+                self.create_tail(
+                    tabname, job.csv_paths[tabname], job.mode,
+                    job.offsets[tabname], job.unterminated[tabname]
+                )
+
+        if job.is_running():
+            for tabname, fraction in job.progress.items():
+                if tabname not in job.collected:
+                    treeview_csv_info.set_status(tabname, f'{fraction:.0%}')
+            self.root.after(App.IMPORT_POLL_INTERVAL, self.poll_import, job)
+        else:
+            self.import_job = None
+            if self.session_state is not None:
+                self.restore_session_state(self.session_state)
+                self.session_state = None
+
+    def get_done_status(self, tabname: TabName, job: importer.ImportJob) -> str:
+        if tabname not in job.sizes:
+            return 'done'
+        before, after = job.sizes[tabname]
+        return (
+            f'done, {before / 1024 ** 2:.1f} -> {after / 1024 ** 2:.1f} MiB '
+            f'({1 - after / max(before, 1):.0%} saved)'
+        )
+
+    @perf.timed(category='gui')
+    def add_to_data_pool(
+            self, tabname: TabName,
+            dataframe: Union[pd.DataFrame, csv_reader.LazyFrame]):
+
+        notebook_data_pool = self.config_widgets['data_pool']
+        notebook_data_visual = self.config_widgets['data_visual']
+        is_first = not self.data_pool
+        self.data_pool[tabname] = dataframe
+        notebook_data_pool.present_dataframe(tabname, dataframe)
+        if is_first:
+            notebook_data_visual.initialize_widgets('1', self.data_pool)
+        else:
+            notebook_data_visual.update_csv_options(self.data_pool)
+
+    def create_tail(
+            self, tabname: TabName, path: str, mode: str, offset: int,
+            unterminated: bool):
+
+        import pandas as pd
+
+        import csv_reader
+        import tail
+
+        dataframe = self.data_pool[tabname]
+        if csv_reader.get_compression(path) is not None:
+            # appended bytes of a compressed file are not appended rows
+            return
+        if mode == 'memory' and isinstance(dataframe, pd.DataFrame):
+            self.tails[tabname] = tail.CsvTail(
+                path, dataframe.dtypes, offset, unterminated
+            )
+
+    def restore_tails(self, csv_paths: Dict[TabName, str], state: Dict):
+        '''
+        Follow the files of frames restored from a session from where their
+        tails stopped, or from the end of the files.
+        '''
+        import os
+
+        import csv_reader
+
+        offsets = state.get('tails', {})
+        for tabname, path in csv_paths.items():
+            if not os.path.exists(path):
+                continue
+            if tabname in offsets:
+                offset, unterminated = offsets[tabname]
+            else:
+                size = os.path.getsize(path)
+                offset = csv_reader.get_complete_size(path, size)
+                unterminated = offset < size
+            self.create_tail(
+                tabname, path, state['import_options']['mode'],
+                offset, unterminated
+            )
+
+    def toggle_follow(self):
+        is_following = bool(self.config_widgets['import_options']['follow'].get())
+        if self.figure_presenter is not None:
+            self.figure_presenter.set_animated(is_following)
+        if is_following and not self.is_following:
+            self.is_following = True
+            self.poll_tails()
+
+    def poll_tails(self):
+        if not self.config_widgets['import_options']['follow'].get():
+            self.is_following = False
+            return
+        try:
+            self.update_tails()
+        finally:
+            self.root.after(App.FOLLOW_INTERVAL, self.poll_tails)
+
+    def update_tails(self):
+        import expressions
+        import spectra
+        import tail
+
+        treeview_csv_info = self.config_widgets['csv_info']
+        notebook_data_pool = self.config_widgets['data_pool']
+        is_changed = False
+        for tabname, csv_tail in list(self.tails.items()):
+            if tabname not in self.data_pool:
+                continue
+            if tabname not in self.appendables:
+                self.appendables[tabname] = tail.AppendableFrame(
+                    self.data_pool[tabname]
+                )
+            skipped_rows = csv_tail.skipped_rows
+            try:
+                replace_last = csv_tail.unterminated
+                new_rows = csv_tail.poll()
+                if new_rows is None:
+                    continue
+                csv_tail.unterminated = False
+                dataframe = self.appendables[tabname].append(
+                    new_rows, replace_last
+                )
+            except (OSError, ValueError) as e:
+                self.tails.pop(tabname)
+                treeview_csv_info.set_status(tabname, f'follow stopped ({e})')
+                continue
+            if csv_tail.skipped_rows != skipped_rows:
+                treeview_csv_info.set_status(
+                    tabname, f'following, {csv_tail.skipped_rows} rows skipped'
+                )
+            if tabname in self.stats:
+                self.stats[tabname].update(new_rows)
+            self.data_pool[tabname] = dataframe
+            notebook_data_pool.update_dataframe(tabname, dataframe)
+            is_changed = True
+
+        if is_changed and hasattr(self, 'plotted_csv_idx'):
+            try:
+                self.figure_presenter.refresh_data(
+                    [self.data_pool[csv_idx] for csv_idx in self.plotted_csv_idx]
+                )
+            except (expressions.Error, spectra.Error):
+                # e.g. datasets combined by an expression grew unevenly;
+                # the next poll catches up
+                pass
+
+    def cancel_import(self):
+        job: importer.ImportJob = getattr(self, 'import_job', None)
+        if job is not None and job.is_running():
+            job.cancel()
+            for tabname in job.futures:
+                if tabname not in job.collected:
+                    self.config_widgets['csv_info'].set_status(
+                        tabname, 'cancelled'
+                    )
+        self.import_job = None
+        self.session_state = None
+
+    def reset_data_pool(self):
+        import plotting
 
-    def clear_data_pool(self):
         self.data_pool: DataPool = {}
+        self.stats = {}
+        self.tails = {}
+        self.appendables = {}
+        plotting.clear_caches()
+
+    def clear_data_pool(self):
+        self.cancel_import()
+        self.reset_data_pool()
         self.config_widgets['data_pool'].clear_content()
 
+    @perf.timed(category='gui')
     def change_number_of_dataset(self):
         try:
             self.check_data_pool()
@@ -580,6 +1235,7 @@ class App:
         if widgets['assign_range'].get():
             widgets['min'].config(state='normal')
             widgets['max'].config(state='normal')
+            self.fill_range('axis_x')
         else:
             widgets['min'].config(state='disabled')
             widgets['max'].config(state='disabled')
@@ -588,16 +1244,79 @@ class App:
         if widgets['assign_range'].get():
             widgets['min'].config(state='normal')
             widgets['max'].config(state='normal')
+            self.fill_range('axis_y')
         else:
             widgets['min'].config(state='disabled')
             widgets['max'].config(state='disabled')
 
+    def collect_field_stats(
+            self, axis: str) -> Dict[str, column_stats.ColumnStats]:
+
+        field = 'field_x' if axis == 'axis_x' else 'field_y'
+        field_stats = {}
+        notebook = self.config_widgets['data_visual']
+        for tab in notebook.tabs_.values():
+            csv_idx = tab.widgets['csv_idx'].get()
+            fieldname = tab.widgets[field].get()
+            # derived series have their own range
+            if tab.widgets['series'].get() not in ('', 'raw'):
+                continue
+            if axis == 'axis_y' and tab.widgets['expression'].get().strip():
+                continue
+            if csv_idx in self.stats:
+                stats = self.stats[csv_idx].get_stats()
+                if fieldname in stats:
+                    field_stats[f'CSV {csv_idx}: {fieldname}'] = stats[fieldname]
+        return field_stats
+
+    def fill_range(self, axis: str):
+        '''
+        Fill empty Min / Max entries with the range of the selected fields.
+        '''
+        import column_stats
+
+        widgets = self.config_widgets[axis]
+        if widgets['min'].get() or widgets['max'].get():
+            return
+        field_range = column_stats.get_field_range(
+            list(self.collect_field_stats(axis).values())
+        )
+        if field_range is not None:
+            widgets['min'].insert(0, format_number(field_range[0]))
+            widgets['max'].insert(0, format_number(field_range[1]))
+
+    def confirm_log_scale(self) -> bool:
+        non_positive = []
+        for axis in ('axis_x', 'axis_y'):
+            if self.config_widgets[axis]['scale'].get() != 'log':
+                continue
+            for name, stats in self.collect_field_stats(axis).items():
+                if not stats['is_positive']:
+                    non_positive.append(name)
+        if not non_positive:
+            return True
+        return tk.messagebox.askokcancel(
+            title='Log scale',
+            message=(
+                'These fields hold values <= 0, which a log scale cannot '
+                'show:\n' + '\n'.join(non_positive) + '\n\nPlot anyway?'
+            )
+        )
+
     def collect_data_send(self) -> Sequence[pd.DataFrame]:
+        import csv_reader
+
         data_send = []
         notebook = self.config_widgets['data_visual']
         for tab in notebook.tabs_.values():
             csv_idx = tab.widgets['csv_idx'].get()
-            data_send.append(self.data_pool[csv_idx])
+            dataframe = self.data_pool[csv_idx]
+            if isinstance(dataframe, csv_reader.LazyFrame):
+                dataframe.load([
+                    tab.widgets['field_x'].get(),
+                    tab.widgets['field_y'].get()
+                ])
+            data_send.append(dataframe)
         return data_send
 
     def collect_configurations_data(self):
@@ -607,7 +1326,9 @@ class App:
             labels.append(tab.widgets['label'].get())
             fieldnames.append({
                 'x': tab.widgets['field_x'].get(),
-                'y': tab.widgets['field_y'].get()
+                'y': tab.widgets['field_y'].get(),
+                'series': tab.widgets['series'].get() or 'raw',
+                'expression': tab.widgets['expression'].get().strip()
             })
 
     def collect_configurations_figure(self):
@@ -620,6 +1341,8 @@ class App:
         ]
         values['grid_visible'] = widgets['grid_visible'].get()
         values['legend_visible'] = widgets['legend_visible'].get()
+        values['point_budget'] = int(widgets['point_budget'].get())
+        values['decimation'] = widgets['decimation'].get()
 
     def collect_configurations_axes(self):
         widgets = self.config_widgets['axis_x']
@@ -646,25 +1369,260 @@ class App:
         else:
             values['lim'] = None
 
+    @perf.timed(category='gui')
     def plot(self):
         try:
             self.check_data_pool()
         except EmptyDataPoolError as e:
             tk.messagebox.showerror(title='Error', message=e.message)
         else:
+            import expressions
+            import plotting
+            import spectra
+
+            if not self.confirm_log_scale():
+                return
             data_send = self.collect_data_send()
+            self.plotted_csv_idx = [
+                tab.widgets['csv_idx'].get()
+                for tab in self.config_widgets['data_visual'].tabs_.values()
+            ]
             self.config_values = plotting.get_initial_configuration()
             self.collect_configurations_data()
             self.collect_configurations_figure()
             self.collect_configurations_axes()
-            plotting.plot_by_app(self.config_values, data_send)
+            try:
+                self.figure_presenter.update(self.config_values, data_send)
+            except (expressions.Error, spectra.Error) as e:
+                tk.messagebox.showerror(title='Error', message=e.message)
 
+    @perf.timed(category='gui')
     def copy(self):
+        import clipboard
+        import plotting
+
+        presenter = self.figure_presenter
+        if presenter is None or presenter.config is None:
+            tk.messagebox.showerror(
+                title='Error', message=plotting.FigureNumsError.message
+            )
+            return
+        key = presenter.get_render_key('png')
+        is_animated = presenter.is_animated
+        try:
+            presenter.set_animated(False)
+            plotting.copy_to_clipboard(presenter.fig, key)
+        except clipboard.Error as e:
+            tk.messagebox.showerror(title='Error', message=e.message)
+        finally:
+            presenter.set_animated(is_animated)
+
+    def collect_session_state(self) -> Dict:
+        import plotting
+
+        self.config_values = plotting.get_initial_configuration()
+        self.collect_configurations_data()
+        self.collect_configurations_figure()
+        try:
+            self.collect_configurations_axes()
+        except ValueError:
+            # unfinished Min / Max entries are not worth failing the save
+            for axis in ('axis_x', 'axis_y'):
+                self.config_values[axis]['lim'] = None
+        import_options = self.config_widgets['import_options']
+        notebook_data_pool = self.config_widgets['data_pool']
+        return {
+            'config': self.config_values,
+            'csv_idx': [
+                tab.widgets['csv_idx'].get()
+                for tab in self.config_widgets['data_visual'].tabs_.values()
+            ],
+            'import_options': {
+                'mode': import_options['mode'].get(),
+                'compact': import_options['compact'].get(),
+            },
+            'filters': {
+                tabname: widgets['entry'].get()
+                for tabname, widgets in notebook_data_pool.filter_widgets.items()
+            },
+            'tails': {
+                tabname: [csv_tail.offset, csv_tail.unterminated]
+                for tabname, csv_tail in self.tails.items()
+            },
+        }
+
+    @perf.timed(category='gui')
+    def save_session(self):
+        import csv_reader
+        import session
+
+        try:
+            self.check_data_pool()
+        except EmptyDataPoolError as e:
+            tk.messagebox.showerror(title='Error', message=e.message)
+            return
+        path = filedialog.asksaveasfilename(
+            title='Save session',
+            defaultextension=session.SUFFIX,
+            filetypes=[('sessions', f'*{session.SUFFIX}'), ('all files', '*')]
+        )
+        if not path:
+            return
+        csv_paths = self.config_widgets['csv_info'].collect_csv_paths()
+        data_pool = {
+            tabname: dataframe for tabname, dataframe in self.data_pool.items()
+            if not isinstance(dataframe, csv_reader.LazyFrame)
+        }
+        stats = {
+            tabname: accumulator.to_dict()
+            for tabname, accumulator in self.stats.items()
+        }
         try:
-            plotting.copy_to_clipboard()
-        except plotting.FigureNumsError as e:
+            session.save(
+                path, csv_paths, data_pool, stats, self.collect_session_state()
+            )
+        except OSError as e:
+            tk.messagebox.showerror(title='Error', message=str(e))
+
+    @perf.timed(category='gui')
+    def open_session(self):
+        import pandas as pd
+
+        import column_stats
+        import importer
+        import session
+
+        path = filedialog.askopenfilename(
+            title='Open session',
+            filetypes=[('sessions', f'*{session.SUFFIX}'), ('all files', '*')]
+        )
+        if not path:
+            return
+        try:
+            header, data_pool, changed = session.load(path)
+        except session.Error as e:
             tk.messagebox.showerror(title='Error', message=e.message)
+            return
+
+        self.cancel_import()
+        treeview_csv_info = self.config_widgets['csv_info']
+        notebook_data_pool = self.config_widgets['data_pool']
+        notebook_data_visual = self.config_widgets['data_visual']
+        csv_paths = header['csv_paths']
+        csv_info = pd.DataFrame(
+            [[tabname, path, ''] for tabname, path in csv_paths.items()],
+            columns=['CSV ID', 'CSV Path', 'Status']
+        )
+        treeview_csv_info.clear_content()
+        treeview_csv_info.insert_dataframe(csv_info)
+        treeview_csv_info.adjust_column_width(csv_info)
+        self.reset_data_pool()
+        notebook_data_pool.clear_content()
+        notebook_data_pool.remove_all_tabs()
+        notebook_data_visual.remove_all_tabs()
+        notebook_data_visual.create_new_empty_tab('1')
+        notebook_data_visual.fill_data_visual_widgets('1')
+
+        state = header['state']
+        import_options = self.config_widgets['import_options']
+        import_options['mode'].set(state['import_options']['mode'])
+        import_options['compact'].set(state['import_options']['compact'])
+        for tabname, dataframe in data_pool.items():
+            treeview_csv_info.set_status(tabname, 'done, from session')
+            if tabname in header['stats']:
+                self.stats[tabname] = column_stats.StatsAccumulator.from_dict(
+                    header['stats'][tabname]
+                )
+            self.add_to_data_pool(tabname, dataframe)
+        self.restore_tails(
+            {tabname: csv_paths[tabname] for tabname in data_pool}, state
+        )
+
+        reimport = {
+            tabname: path for tabname, path in csv_paths.items()
+            if tabname not in data_pool
+        }
+        if not reimport:
+            self.restore_session_state(state)
+            return
+        for tabname in reimport:
+            status = 'changed, queued' if tabname in changed else 'queued'
+            treeview_csv_info.set_status(tabname, status)
+        self.session_state = state
+        self.import_job = importer.ImportJob(
+            reimport, state['import_options']['mode'],
+            compact=bool(state['import_options']['compact'])
+        )
+        self.poll_import(self.import_job)
+
+    def restore_session_state(self, state: Dict):
+        '''
+        Put the dataset tabs, figure and axis settings and filters of a
+        session back into the widgets.
+        '''
+        if not self.data_pool:
+            return
+        config = state['config']
+        notebook = self.config_widgets['data_visual']
+        self.config_widgets['dataset_number'].stringvar.set(len(state['csv_idx']))
+        for idx, (csv_idx, fieldname, label) in enumerate(zip(
+                state['csv_idx'], config['data']['fieldnames'],
+                config['data']['labels']), 1):
+
+            tabname = str(idx)
+            if tabname not in notebook.tabs_:
+                notebook.create_new_empty_tab(tabname)
+                notebook.fill_data_visual_widgets(tabname)
+                notebook.initialize_widgets(tabname, self.data_pool)
+            widgets = notebook.tabs_[tabname].widgets
+            if csv_idx in self.data_pool:
+                widgets['csv_idx'].set(csv_idx)
+                notebook.update_fieldname_options(tabname, self.data_pool)
+            widgets['field_x'].set(fieldname['x'])
+            widgets['field_y'].set(fieldname['y'])
+            widgets['series'].set(fieldname.get('series', 'raw'))
+            set_entry(widgets['label'], label)
+            set_entry(widgets['expression'], fieldname.get('expression', ''))
+
+        widgets = self.config_widgets['figure_visual']
+        set_entry(widgets['title'], config['figure']['title'])
+        widgets['width'].set(config['figure']['size'][0])
+        widgets['height'].set(config['figure']['size'][1])
+        widgets['grid_visible'].set(config['figure']['grid_visible'])
+        widgets['legend_visible'].set(config['figure']['legend_visible'])
+        widgets['point_budget'].set(config['figure']['point_budget'])
+        widgets['decimation'].set(config['figure']['decimation'])
+
+        for axis in ('axis_x', 'axis_y'):
+            widgets = self.config_widgets[axis]
+            set_entry(widgets['label'], config[axis]['label'])
+            widgets['scale'].set(config[axis]['scale'])
+            lim = config[axis]['lim'] or ['', '']
+            widgets['assign_range'].set(bool(config[axis]['lim']))
+            set_entry(widgets['min'], lim[0])
+            set_entry(widgets['max'], lim[1])
+        self.active_deactive_range()
+
+        notebook_data_pool = self.config_widgets['data_pool']
+        for tabname, text in state['filters'].items():
+            if text and tabname in notebook_data_pool.filter_widgets:
+                set_entry(notebook_data_pool.filter_widgets[tabname]['entry'], text)
+                notebook_data_pool.apply_filter(tabname)
+
+    def show_stats_panel(self):
+        if self.stats_panel is not None and self.stats_panel.winfo_exists():
+            self.stats_panel.destroy()
+        self.stats_panel = StatsPanel(self.root, {
+            tabname: accumulator.get_stats()
+            for tabname, accumulator in self.stats.items()
+        })
+
+    def show_perf_panel(self):
+        if self.perf_panel is not None and self.perf_panel.winfo_exists():
+            self.perf_panel.lift()
+        else:
+            self.perf_panel = PerfPanel(self.root)
 
 
 if __name__ == '__main__':
-    App()
+    App().run()
@@ -0,0 +1,166 @@
+from io import BytesIO
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import csv_reader
+
+
+CHUNK_BYTES = 64 * 1024 ** 2
+ROWS_PER_BUCKET = 1000
+
+
+def iter_line_blocks(path: str, chunk_bytes: int) -> Iterator[Tuple[int, bytes]]:
+    '''
+    Blocks of complete lines after the header, with their byte offsets.
+    '''
+    schema = csv_reader.schema_cache.get(path)
+    with open(path, 'rb') as raw, csv_reader.decompress(raw, path) as f:
+        offset = len(f.readline()) if schema['has_header'] else 0
+        carry = b''
+        while True:
+            block = f.read(chunk_bytes)
+            data = carry + block
+            if not data:
+                break
+            if block:
+                end = data.rfind(b'\n')
+                if end < 0:
+                    carry = data
+                    continue
+                carry = data[end + 1:]
+                data = data[:end + 1]
+            else:
+                carry = b''
+            yield offset, data
+            offset += len(data)
+
+
+def get_line_spans(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Start and end offsets of the non-blank lines in `data`.
+    '''
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(buffer == ord('\n'))
+    starts = np.concatenate([[0], newlines + 1])
+    ends = np.concatenate([newlines, [len(data)]])
+    lengths = ends - starts
+    first_bytes = buffer[np.minimum(starts, max(len(data) - 1, 0))]
+    is_blank = (lengths == 0) | ((lengths == 1) & (first_bytes == ord('\r')))
+    return starts[~is_blank], ends[~is_blank]
+
+
+def parse_block(
+        data: bytes, schema: csv_reader.CsvSchema,
+        columns: List[str], usecols: List[str]) -> pd.DataFrame:
+
+    return pd.read_csv(
+        BytesIO(data),
+        header=None,
+        names=columns,
+        usecols=usecols,
+        sep=schema['delimiter'],
+        decimal=schema['decimal']
+    )[usecols]
+
+
+def get_columns(path: str) -> List[str]:
+    schema = csv_reader.schema_cache.get(path)
+    options = csv_reader.get_read_options(schema)
+    options.pop('dtype')
+    return list(pd.read_csv(path, nrows=0, **options).columns)
+
+
+def build_overview(
+        path: str, field_x: str, field_y: str,
+        bucket_width: float = None,
+        chunk_bytes: int = CHUNK_BYTES) -> pd.DataFrame:
+    '''
+    Min / max / mean of `field_y` per bucket of `field_x`, read in chunks.
+    '''
+    schema = csv_reader.schema_cache.get(path)
+    columns = get_columns(path)
+    origin = None
+    partials = []
+    for offset, data in iter_line_blocks(path, chunk_bytes):
+        chunk = parse_block(data, schema, columns, [field_x, field_y])
+        starts, ends = get_line_spans(data)
+        if len(starts) != len(chunk):
+            # lines the parser skipped (comments, quoted newlines)
+            starts = np.zeros(len(chunk), dtype=np.int64)
+            ends = np.full(len(chunk), len(data))
+        values_x = chunk[field_x].to_numpy(dtype='float64')
+        values_y = chunk[field_y].to_numpy(dtype='float64')
+        if origin is None:
+            origin = values_x[0]
+        if bucket_width is None:
+            spacing = np.nanmedian(np.abs(np.diff(values_x))) if len(chunk) > 1 else 0
+            bucket_width = spacing * ROWS_PER_BUCKET or 1.0
+        frame = pd.DataFrame({
+            'bucket': np.floor((values_x - origin) / bucket_width),
+            'x': values_x,
+            'y': values_y,
+            'byte_start': offset + starts,
+            'byte_stop': offset + ends + 1,
+        })
+        partials.append(frame.groupby('bucket').agg(
+            x_min=('x', 'min'), x_max=('x', 'max'),
+            y_min=('y', 'min'), y_max=('y', 'max'),
+            y_sum=('y', 'sum'), count=('y', 'count'),
+            byte_start=('byte_start', 'min'), byte_stop=('byte_stop', 'max'),
+        ))
+
+    if not partials:
+        return pd.DataFrame(columns=[
+            'x_min', 'x_max', 'y_min', 'y_max', 'y_mean', 'count',
+            'byte_start', 'byte_stop'
+        ])
+    buckets = pd.concat(partials).groupby(level=0).agg({
+        'x_min': 'min', 'x_max': 'max',
+        'y_min': 'min', 'y_max': 'max',
+        'y_sum': 'sum', 'count': 'sum',
+        'byte_start': 'min', 'byte_stop': 'max',
+    })
+    buckets['y_mean'] = buckets.pop('y_sum') / buckets['count']
+    return buckets.reset_index(drop=True)
+
+
+def read_range(path: str, start: int, stop: int) -> bytes:
+    '''
+    Bytes `start` to `stop` of the decompressed file.
+    '''
+    with open(path, 'rb') as raw, csv_reader.decompress(raw, path) as f:
+        if f.seekable():
+            f.seek(start)
+        else:
+            remaining = start
+            while remaining > 0:
+                skipped = len(f.read(min(remaining, CHUNK_BYTES)))
+                if not skipped:
+                    break
+                remaining -= skipped
+        return f.read(stop - start)
+
+
+def read_buckets(
+        path: str, buckets: pd.DataFrame, first: int, last: int) -> pd.DataFrame:
+    '''
+    Rows in the byte range of buckets `first` to `last` (inclusive).
+    '''
+    selected = buckets.iloc[first:last + 1]
+    start = int(selected['byte_start'].min())
+    stop = int(selected['byte_stop'].max())
+    data = read_range(path, start, stop)
+    schema = csv_reader.schema_cache.get(path)
+    columns = get_columns(path)
+    return parse_block(data, schema, columns, columns)
+
+
+def get_envelope(buckets: pd.DataFrame) -> Dict[str, np.ndarray]:
+    return {
+        'x': ((buckets['x_min'] + buckets['x_max']) / 2).to_numpy(),
+        'y_min': buckets['y_min'].to_numpy(),
+        'y_max': buckets['y_max'].to_numpy(),
+        'y_mean': buckets['y_mean'].to_numpy(),
+    }
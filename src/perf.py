@@ -0,0 +1,223 @@
+'''
+Stage timings for the app and the plotting functions.
+
+Recording is off unless CSVIEWER_PERF is set or it is switched on in the
+performance panel. While it is off, `stage` returns a shared no-op context
+and `timed` calls straight through, so instrumented code pays one attribute
+lookup per call.
+'''
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from typing import Callable, List, TypedDict
+
+
+class StageRecord(TypedDict):
+    name: str
+    category: str
+    start: float
+    wall: float
+    cpu: float
+    rows: int
+    bytes: int
+    peak_bytes: int
+    thread: int
+    thread_name: str
+
+
+class Stage:
+    '''
+    One running stage. Wall time is measured with `perf_counter`, CPU time
+    with `thread_time`, so stages on import workers are not charged for the
+    other threads. The peak is the tracemalloc peak above the allocation at
+    entry; tracemalloc is process-wide, so stages overlapping on several
+    threads share their peaks.
+    '''
+    def __init__(self, recorder: 'Recorder', name: str, category: str):
+        self.recorder = recorder
+        self.name = name
+        self.category = category
+        self.rows = 0
+        self.bytes = 0
+        self.child_peak = 0
+
+    def __enter__(self) -> 'Stage':
+        stack = self.recorder.get_stack()
+        self.parent = stack[-1] if stack else None
+        stack.append(self)
+        self.is_tracing = tracemalloc.is_tracing()
+        if self.is_tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None:
+                self.parent.child_peak = max(self.parent.child_peak, peak)
+            tracemalloc.reset_peak()
+            self.memory = current
+        self.cpu = time.thread_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        wall = time.perf_counter() - self.start
+        cpu = time.thread_time() - self.cpu
+        peak_bytes = 0
+        if self.is_tracing and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, self.child_peak)
+            peak_bytes = max(peak - self.memory, 0)
+            if self.parent is not None:
+                self.parent.child_peak = max(self.parent.child_peak, peak)
+        self.recorder.get_stack().pop()
+        thread = threading.current_thread()
+        self.recorder.add({
+            'name': self.name,
+            'category': self.category,
+            'start': self.start - self.recorder.origin,
+            'wall': wall,
+            'cpu': cpu,
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'peak_bytes': peak_bytes,
+            'thread': thread.ident,
+            'thread_name': thread.name,
+        })
+        return False
+
+
+class NullStage:
+    '''Stand-in returned while recording is off.'''
+    def __enter__(self) -> 'NullStage':
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+    def __setattr__(self, name: str, value):
+        pass
+
+
+NULL_STAGE = NullStage()
+
+
+class Recorder:
+    MAX_RECORDS = 100_000
+
+    def __init__(self):
+        self.enabled = os.environ.get('CSVIEWER_PERF', '') not in ('', '0')
+        self.records: List[StageRecord] = []
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def get_stack(self) -> List[Stage]:
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    def stage(self, name: str, category: str = 'app'):
+        if not self.enabled:
+            return NULL_STAGE
+        return Stage(self, name, category)
+
+    def count(self, rows: int = 0, nbytes: int = 0):
+        '''
+        Add processed rows and bytes to the innermost stage of this thread.
+        '''
+        if not self.enabled:
+            return
+        stack = self.get_stack()
+        if stack:
+            stack[-1].rows += rows
+            stack[-1].bytes += nbytes
+
+    @property
+    def trace_memory(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def set_trace_memory(self, trace_memory: bool):
+        '''
+        Peak allocations need tracemalloc, which slows every Python-level
+        allocation down; it is therefore switched on separately.
+        '''
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def add(self, record: StageRecord):
+        with self.lock:
+            self.records.append(record)
+            if len(self.records) > Recorder.MAX_RECORDS:
+                del self.records[:len(self.records) - Recorder.MAX_RECORDS]
+
+    def get_records(self) -> List[StageRecord]:
+        with self.lock:
+            return list(self.records)
+
+    def clear(self):
+        with self.lock:
+            self.records = []
+            self.origin = time.perf_counter()
+
+    def export_chrome_trace(self, path: str):
+        '''
+        Write the records as Chrome trace events, which chrome://tracing and
+        Perfetto open directly. Times are in microseconds.
+        '''
+        pid = os.getpid()
+        events = []
+        thread_names = {}
+        for record in self.get_records():
+            thread_names[record['thread']] = record['thread_name']
+            events.append({
+                'name': record['name'],
+                'cat': record['category'],
+                'ph': 'X',
+                'ts': record['start'] * 1e6,
+                'dur': record['wall'] * 1e6,
+                'pid': pid,
+                'tid': record['thread'],
+                'args': {
+                    'cpu_ms': record['cpu'] * 1e3,
+                    'rows': record['rows'],
+                    'bytes': record['bytes'],
+                    'peak_bytes': record['peak_bytes'],
+                },
+            })
+        for thread, thread_name in thread_names.items():
+            events.append({
+                'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread,
+                'args': {'name': thread_name},
+            })
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+recorder = Recorder()
+
+
+def stage(name: str, category: str = 'app'):
+    return recorder.stage(name, category)
+
+
+def count(rows: int = 0, nbytes: int = 0):
+    recorder.count(rows, nbytes)
+
+
+def timed(name: str = None, category: str = 'app') -> Callable:
+    '''
+    Decorator recording every call of the function as a stage.
+    '''
+    def decorator(func: Callable) -> Callable:
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not recorder.enabled:
+                return func(*args, **kwargs)
+            with Stage(recorder, stage_name, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,15 +1,35 @@
+from __future__ import annotations
+
+import copy
 import json
 from io import BytesIO
 from pathlib import Path
-from typing import Callable, Dict, Sequence, Tuple, TypedDict
+from typing import TYPE_CHECKING, Callable, Dict, List, Sequence, Tuple, TypedDict
 
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-import win32clipboard
+
+import clipboard
+import csv_reader
+import downsampling
+import expressions
+import importer
+import overview
+import perf
+import render_cache
+import spectra
+from fingerprint import digests, fingerprint
+from memo import LRUCache
+
+if TYPE_CHECKING:
+    import matplotlib.pyplot as plt
+    from matplotlib.figure import Figure
 
 
 class DataConfig(TypedDict):
     directory: str
+    mode: str
+    compact: bool
     labels: Sequence[str]
     fieldnames: Sequence[Dict[str, str]]
 
@@ -19,6 +39,8 @@ class FigureConfig(TypedDict):
     size: Sequence[float]
     grid_visible: bool
     legend_visible: bool
+    point_budget: int
+    decimation: str
 
 
 class AxisConfig(TypedDict):
@@ -44,10 +66,26 @@ class FigureNumsError(Error):
     message = 'No figure to copy.'
 
 
+DERIVED_CACHE_SIZE = 32
+derived_cache = LRUCache(DERIVED_CACHE_SIZE)
+
+
+def clear_caches():
+    '''
+    Drop memoized series and digests. They hold the arrays they were
+    computed from, so they are cleared whenever the data pool is replaced.
+    '''
+    derived_cache.clear()
+    expressions.evaluation_cache.clear()
+    digests.clear()
+
+
 def get_initial_configuration():
     config_ini: Config = {
         'data': {
             'directory': '',
+            'mode': 'memory',
+            'compact': False,
             'labels': [],
             'fieldnames': []
         },
@@ -55,7 +93,9 @@ def get_initial_configuration():
             'title': '',
             'size': [],
             'grid_visible': False,
-            'legend_visible': False
+            'legend_visible': False,
+            'point_budget': 0,
+            'decimation': 'none'
         },
         'axis_x': {
             'label': '',
@@ -79,13 +119,28 @@ def read_configurations(config_name: str) -> Config:
     return config
 
 
-def get_data_pool(config: Config) -> Sequence[pd.DataFrame]:
+def get_csv_paths(config: Config) -> List[Path]:
     data_dir = config['data']['directory']
-    csvs = list(Path(data_dir).glob('*.csv'))
-    return [pd.read_csv(path) for path in csvs]
+    return [
+        path for pattern in csv_reader.CSV_PATTERNS
+        for path in Path(data_dir).glob(pattern)
+    ]
+
+
+@perf.timed(category='plot')
+def get_data_pool(config: Config) -> Sequence[pd.DataFrame]:
+    csvs = get_csv_paths(config)
+    mode = config['data'].get('mode', 'memory')
+    job = importer.ImportJob(
+        {str(idx): str(path) for idx, path in enumerate(csvs)}, mode,
+        compact=config['data'].get('compact', False)
+    )
+    return job.wait()
 
 
 def initialize_figure(config: Config) -> Tuple[plt.Figure, plt.Axes]:
+    import matplotlib.pyplot as plt
+
     figsize = config['figure']['size']
     fig = plt.figure(figsize=figsize, tight_layout=True)
     ax = plt.axes()
@@ -106,70 +161,456 @@ def get_plot_function(config: Config, ax: plt.Axes):
     return plot_function
 
 
+def is_monotonic(values: np.ndarray) -> bool:
+    if len(values) < 2 or not np.issubdtype(values.dtype, np.number):
+        return False
+    steps = np.diff(values)
+    return bool(np.all(steps >= 0) or np.all(steps <= 0))
+
+
+class ViewportLine:
+    '''
+    Keeps the full series of a plotted line and pushes only the part inside
+    the current x-limits, decimated to the screen resolution, to the artist.
+    Monotonic x-columns are sliced with a binary search; other columns are
+    decimated as a whole.
+    '''
+    def __init__(
+            self, line: plt.Line2D, values_x: np.ndarray,
+            values_y: np.ndarray, budget: int, method: str):
+
+        self.line = line
+        self.values_x = values_x
+        self.values_y = values_y
+        self.budget = budget
+        self.method = method
+        self.is_monotonic = is_monotonic(values_x)
+        self.is_descending = (
+            self.is_monotonic and values_x[0] > values_x[-1]
+        )
+        self.decimated: Dict[Tuple[int, int, int], Tuple] = {}
+
+    def get_visible_slice(self, xlim: Sequence[float]) -> slice:
+        if not self.is_monotonic:
+            return slice(None)
+        values_x = self.values_x[::-1] if self.is_descending else self.values_x
+        lower, upper = sorted(xlim)
+        start = max(np.searchsorted(values_x, lower, side='left') - 1, 0)
+        stop = np.searchsorted(values_x, upper, side='right') + 1
+        if self.is_descending:
+            length = len(values_x)
+            start, stop = max(length - stop, 0), length - start
+        return slice(start, stop)
+
+    def set_series(
+            self, values_x: np.ndarray, values_y: np.ndarray,
+            budget: int, method: str):
+
+        self.__init__(self.line, values_x, values_y, budget, method)
+
+    def extend_series(self, values_x: np.ndarray, values_y: np.ndarray):
+        '''
+        Replace the series by a longer one which starts with the current
+        data; only the appended part is checked for monotonicity.
+        '''
+        length = len(self.values_x)
+        if length < 2:
+            self.set_series(values_x, values_y, self.budget, self.method)
+            return
+        if self.is_monotonic:
+            steps = np.diff(values_x[length - 1:])
+            if self.is_descending:
+                self.is_monotonic = bool(np.all(steps <= 0))
+            else:
+                self.is_monotonic = bool(np.all(steps >= 0))
+        self.values_x = values_x
+        self.values_y = values_y
+        self.decimated = {}
+
+    @perf.timed('viewport_update', 'plot')
+    def update(self, xlim: Sequence[float], screen_points: int):
+        visible = self.get_visible_slice(xlim)
+        budget = min(self.budget, screen_points) if self.budget else 0
+        key = (*visible.indices(len(self.values_x))[:2], budget)
+        if key not in self.decimated:
+            # only the latest view is worth keeping next to the full range
+            self.decimated = {
+                k: v for k, v in self.decimated.items()
+                if k[:2] == (0, len(self.values_x))
+            }
+            self.decimated[key] = downsampling.decimate(
+                self.values_x[visible], self.values_y[visible],
+                budget, self.method
+            )
+        self.line.set_data(*self.decimated[key])
+
+
+def get_series(
+        df: pd.DataFrame, fieldname: Dict[str, str]
+        ) -> Tuple[np.ndarray, np.ndarray]:
+
+    if isinstance(df, csv_reader.LazyFrame):
+        df.load([fieldname['x'], fieldname['y']])
+    return np.asarray(df[fieldname['x']]), np.asarray(df[fieldname['y']])
+
+
+@perf.timed(category='plot')
+def derive_series(
+        values_x: np.ndarray, values_y: np.ndarray,
+        kind: str) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Series computed from a field pair: 'raw' returns it unchanged, 'fft'
+    its amplitude spectrum and 'response' its 5 % damped response spectrum
+    over `spectra.PERIODS`. Results are memoized by the content of the
+    pair, so re-plotting or switching tabs does not recompute them.
+    '''
+    if kind == 'raw':
+        return values_x, values_y
+    if kind not in spectra.SERIES_KINDS:
+        raise ValueError(f'Unknown series kind: {kind}')
+    key = (kind, fingerprint(values_x, values_y))
+    derived = derived_cache.get(key)
+    if derived is not None:
+        return derived
+    perf.count(rows=len(values_x))
+    if kind == 'fft':
+        derived = spectra.amplitude_spectrum(values_x, values_y)
+    else:
+        derived = (
+            spectra.PERIODS,
+            spectra.response_spectrum(values_x, values_y)[0]
+        )
+    derived_cache.put(key, derived)
+    return derived
+
+
+def is_raw(fieldname: Dict[str, str]) -> bool:
+    return (
+        not fieldname.get('expression')
+        and fieldname.get('series', 'raw') == 'raw'
+    )
+
+
+def get_plotted_series(
+        data_pool: Sequence[pd.DataFrame], fieldnames: Sequence[Dict[str, str]]
+        ) -> List[Tuple[np.ndarray, np.ndarray]]:
+    '''
+    Series of each dataset as plotted: the selected fields, the y-values
+    replaced by the expression of the dataset if it has one, and then the
+    derived series kind applied. Expressions can use the y-fields of all
+    datasets as `y1`, `y2`, ...
+    '''
+    raw = [get_series(df, fieldname) for df, fieldname in zip(data_pool, fieldnames)]
+    variables = {f'y{idx}': values_y for idx, (_, values_y) in enumerate(raw, 1)}
+    plotted = []
+    for df, fieldname, (values_x, values_y) in zip(data_pool, fieldnames, raw):
+        if fieldname.get('expression'):
+            values_y = expressions.evaluate(
+                fieldname['expression'], df,
+                {**variables, 'x': values_x, 'y': values_y}, len(values_x)
+            )
+        plotted.append(
+            derive_series(values_x, values_y, fieldname.get('series', 'raw'))
+        )
+    return plotted
+
+
+@perf.timed(category='plot')
 def plot_data(
         config: Config, data_pool: Sequence[pd.DataFrame],
-        plot_function: Callable):
+        plot_function: Callable) -> List[ViewportLine]:
 
     fieldnames = config['data']['fieldnames']
     labels = config['data']['labels']
-    for df, fieldname, label in zip(data_pool, fieldnames, labels):
-        values_x = df[fieldname['x']]
-        values_y = df[fieldname['y']]
-        plot_function(values_x, values_y, label=label)
-
-
-def set_axes(config: Config, ax: plt.Axes):
+    budget = config['figure'].get('point_budget', 0)
+    method = config['figure'].get('decimation', 'none')
+    viewport_lines = []
+    series = get_plotted_series(data_pool, fieldnames)
+    for (values_x, values_y), label in zip(series, labels):
+        perf.count(rows=len(values_x), nbytes=values_x.nbytes + values_y.nbytes)
+        decimated_x, decimated_y = downsampling.decimate(
+            values_x, values_y, budget, method
+        )
+        line, = plot_function(decimated_x, decimated_y, label=label)
+        viewport_lines.append(
+            ViewportLine(line, values_x, values_y, budget, method)
+        )
+    return viewport_lines
+
+
+@perf.timed(category='plot')
+def plot_overview(config: Config, ax: plt.Axes, plot_function: Callable):
+    '''
+    Envelope (min / max band and mean line) of each series, streamed from
+    the CSV files in chunks so files larger than memory can be drawn.
+    '''
+    fieldnames = config['data']['fieldnames']
+    labels = config['data']['labels']
+    csvs = get_csv_paths(config)
+    for path, fieldname, label in zip(csvs, fieldnames, labels):
+        buckets = overview.build_overview(
+            str(path), fieldname['x'], fieldname['y']
+        )
+        envelope = overview.get_envelope(buckets)
+        line, = plot_function(envelope['x'], envelope['y_mean'], label=label)
+        ax.fill_between(
+            envelope['x'], envelope['y_min'], envelope['y_max'],
+            color=line.get_color(), alpha=0.3, linewidth=0
+        )
+
+
+def connect_viewport(ax: plt.Axes, viewport_lines: Sequence[ViewportLine]):
+    def on_xlim_changed(ax: plt.Axes):
+        screen_points = 2 * max(int(ax.bbox.width), 1)
+        for viewport_line in viewport_lines:
+            viewport_line.update(ax.get_xlim(), screen_points)
+
+    ax.callbacks.connect('xlim_changed', on_xlim_changed)
+    on_xlim_changed(ax)
+
+
+def set_axes_style(config: Config, ax: plt.Axes):
     ax.set_title(config['figure'].get('title', ''))
     ax.set_xlabel(config['axis_x'].get('label', ''))
-    ax.set_xlim(config['axis_x'].get('lim', ''))
     ax.set_ylabel(config['axis_y'].get('label', ''))
-    ax.set_ylim(config['axis_y'].get('lim', ''))
     ax.grid(
         visible=config['figure'].get('grid_visible', ''),
         axis='both'
     )
     if config['figure']['legend_visible']:
         ax.legend()
+    elif ax.get_legend() is not None:
+        ax.get_legend().remove()
 
 
-def main(config_name: str = 'config.json'):
-    config = read_configurations(config_name)
-    data_pool = get_data_pool(config)
-    fig, ax = initialize_figure(config)
-    plot_function = get_plot_function(config, ax)
-    plot_data(config, data_pool, plot_function)
-    set_axes(config, ax)
-    plt.show()
+@perf.timed(category='plot')
+def set_axes(config: Config, ax: plt.Axes):
+    ax.set_xlim(config['axis_x'].get('lim', ''))
+    ax.set_ylim(config['axis_y'].get('lim', ''))
+    set_axes_style(config, ax)
+
+
+class FigurePresenter:
+    '''
+    Persistent figure for the app. Each update is diffed against the
+    previous configuration: labels, limits, grid and scales only touch the
+    axes, and new data is pushed into the existing lines with `set_data`.
+    '''
+    def __init__(self, fig: Figure):
+        self.fig = fig
+        self.ax = fig.add_subplot()
+        self.config: Config = None
+        self.data_pool: List[pd.DataFrame] = []
+        self.series: List[Tuple[np.ndarray, np.ndarray]] = []
+        self.limits: Tuple = None
+        self.viewport_lines: List[ViewportLine] = []
+        self.is_animated = False
+        self.background = None
+        self.ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
+        self.fig.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def get_screen_points(self) -> int:
+        return 2 * max(int(self.ax.bbox.width), 1)
+
+    def on_xlim_changed(self, ax: plt.Axes):
+        for viewport_line in self.viewport_lines:
+            viewport_line.update(ax.get_xlim(), self.get_screen_points())
+
+    def is_data_changed(
+            self, config: Config, data_pool: Sequence[pd.DataFrame]) -> bool:
+
+        if self.config is None or len(data_pool) != len(self.data_pool):
+            return True
+        if any(new is not old for new, old in zip(data_pool, self.data_pool)):
+            return True
+        old_figure, new_figure = self.config['figure'], config['figure']
+        return (
+            self.config['data']['fieldnames'] != config['data']['fieldnames']
+            or old_figure.get('point_budget') != new_figure.get('point_budget')
+            or old_figure.get('decimation') != new_figure.get('decimation')
+        )
+
+    def update_lines(self, config: Config, data_pool: Sequence[pd.DataFrame]):
+        fieldnames = config['data']['fieldnames']
+        budget = config['figure'].get('point_budget', 0)
+        method = config['figure'].get('decimation', 'none')
+        viewport_lines = []
+        series = get_plotted_series(data_pool, fieldnames)
+        self.series = series
+        for idx, (values_x, values_y) in enumerate(series):
+            perf.count(rows=len(values_x), nbytes=values_x.nbytes + values_y.nbytes)
+            if idx < len(self.viewport_lines):
+                viewport_line = self.viewport_lines[idx]
+                viewport_line.set_series(values_x, values_y, budget, method)
+            else:
+                line, = self.ax.plot([], [], animated=self.is_animated)
+                viewport_line = ViewportLine(
+                    line, values_x, values_y, budget, method
+                )
+            viewport_lines.append(viewport_line)
+        for viewport_line in self.viewport_lines[len(viewport_lines):]:
+            viewport_line.line.remove()
+        self.viewport_lines = viewport_lines
+
+    def update_limits(self, config: Config):
+        xlim = config['axis_x'].get('lim')
+        ylim = config['axis_y'].get('lim')
+        if not xlim or not ylim:
+            for viewport_line in self.viewport_lines:
+                viewport_line.update((-np.inf, np.inf), self.get_screen_points())
+            self.ax.relim()
+            self.ax.autoscale(enable=True)
+        if xlim:
+            self.ax.set_xlim(xlim)
+        if ylim:
+            self.ax.set_ylim(ylim)
+
+    def get_limits(self) -> Tuple:
+        return (*self.ax.get_xlim(), *self.ax.get_ylim())
+
+    def is_unchanged(
+            self, config: Config, data_pool: Sequence[pd.DataFrame]) -> bool:
+        '''
+        Whether an update would leave the figure as it is: same config, same
+        frames and the view not zoomed or panned since the last update.
+        '''
+        return (
+            not self.is_data_changed(config, data_pool)
+            and config == self.config
+            and self.get_limits() == self.limits
+        )
+
+    def get_render_key(self, fmt: str = 'png') -> str:
+        return render_cache.make_key(
+            self.config, self.series, fmt, render_cache.get_view(self.fig)
+        )
+
+    @perf.timed('presenter_update', 'plot')
+    def update(self, config: Config, data_pool: Sequence[pd.DataFrame]):
+        if self.is_unchanged(config, data_pool):
+            return
+        old = self.config or get_initial_configuration()
+        if self.is_data_changed(config, data_pool):
+            self.update_lines(config, data_pool)
+        for viewport_line, label in zip(
+                self.viewport_lines, config['data']['labels']):
+            viewport_line.line.set_label(label)
+        if old['figure']['size'] != config['figure']['size']:
+            self.fig.set_size_inches(*config['figure']['size'], forward=True)
+        if old['axis_x']['scale'] != config['axis_x']['scale']:
+            self.ax.set_xscale(config['axis_x']['scale'])
+        if old['axis_y']['scale'] != config['axis_y']['scale']:
+            self.ax.set_yscale(config['axis_y']['scale'])
+        self.update_limits(config)
+        set_axes_style(config, self.ax)
+        self.config = copy.deepcopy(config)
+        self.data_pool = list(data_pool)
+        self.limits = self.get_limits()
+        self.fig.canvas.draw_idle()
+
+    def set_animated(self, is_animated: bool):
+        '''
+        Animated lines are left out of normal draws and blitted on top of a
+        cached background instead, which is what live updates need.
+        '''
+        self.is_animated = is_animated
+        self.background = None
+        for viewport_line in self.viewport_lines:
+            viewport_line.line.set_animated(is_animated)
+        self.fig.canvas.draw_idle()
+
+    def on_draw(self, event):
+        if self.is_animated:
+            self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+            self.draw_lines()
+
+    def draw_lines(self):
+        for viewport_line in self.viewport_lines:
+            self.ax.draw_artist(viewport_line.line)
+
+    def blit(self):
+        if self.background is None:
+            self.fig.canvas.draw_idle()
+            return
+        self.fig.canvas.restore_region(self.background)
+        self.draw_lines()
+        self.fig.canvas.blit(self.fig.bbox)
+
+    @perf.timed('presenter_refresh', 'plot')
+    def refresh_data(self, data_pool: Sequence[pd.DataFrame]):
+        '''
+        Push grown versions of the plotted frames into the lines. With fixed
+        limits only the lines are blitted; otherwise the axes are rescaled.
+        '''
+        if self.config is None:
+            return
+        fieldnames = self.config['data']['fieldnames']
+        series = get_plotted_series(data_pool, fieldnames)
+        self.series = series
+        for idx, (df, fieldname) in enumerate(zip(data_pool, fieldnames)):
+            if idx >= len(self.viewport_lines) or df is self.data_pool[idx]:
+                continue
+            viewport_line = self.viewport_lines[idx]
+            values_x, values_y = series[idx]
+            if is_raw(fieldname):
+                viewport_line.extend_series(values_x, values_y)
+            else:
+                # spectra and expressions over other datasets change as a
+                # whole when rows are appended
+                viewport_line.set_series(
+                    values_x, values_y, viewport_line.budget, viewport_line.method
+                )
+        self.data_pool = list(data_pool)
+
+        if self.config['axis_x'].get('lim') and self.config['axis_y'].get('lim'):
+            self.on_xlim_changed(self.ax)
+            self.blit()
+        else:
+            self.update_limits(self.config)
+            self.fig.canvas.draw_idle()
+
 
+def main(config_name: str = 'config.json'):
+    import matplotlib.pyplot as plt
 
-def plot_by_app(config: Config, data_pool: Sequence[pd.DataFrame]):
+    config = read_configurations(config_name)
     fig, ax = initialize_figure(config)
     plot_function = get_plot_function(config, ax)
-    plot_data(config, data_pool, plot_function)
-    set_axes(config, ax)
+    if config['data'].get('mode') == 'overview':
+        plot_overview(config, ax, plot_function)
+        set_axes(config, ax)
+    else:
+        data_pool = get_data_pool(config)
+        viewport_lines = plot_data(config, data_pool, plot_function)
+        set_axes(config, ax)
+        connect_viewport(ax, viewport_lines)
     plt.show()
 
 
-def copy_to_clipboard():
+@perf.timed(category='plot')
+def copy_to_clipboard(fig: Figure = None, key: str = None):
     '''
-    Honestly, I don't know how it works. Here is the reference I found.
-    https://stackoverflow.com/questions/7050448/write-image-to-windows-clipboard-in-python-with-pil-and-win32clipboard
-
-    This method can copy the figure image and paste to MS office but not Paint.
+    Copy the figure as PNG. Without `fig` the current pyplot figure is
+    copied. With a render cache `key`, e.g. from
+    `FigurePresenter.get_render_key`, an unchanged figure is not rendered
+    again.
     '''
-    fignums = plt.get_fignums()  # if no fig -> []
-    if not fignums:
-        raise FigureNumsError
-
-    fig = plt.gcf()
-    buffer = BytesIO()
-    fig.savefig(buffer, format='png')
-    clipboard_format = win32clipboard.RegisterClipboardFormat('PNG')
-    win32clipboard.OpenClipboard()
-    win32clipboard.EmptyClipboard()
-    win32clipboard.SetClipboardData(clipboard_format, buffer.getvalue())
-    win32clipboard.CloseClipboard()
-    buffer.close()
+    if fig is None:
+        import matplotlib.pyplot as plt
+
+        fignums = plt.get_fignums()  # if no fig -> []
+        if not fignums:
+            raise FigureNumsError
+        fig = plt.gcf()
+    with perf.stage('savefig', 'plot') as stage:
+        if key is None:
+            buffer = BytesIO()
+            fig.savefig(buffer, format='png')
+            data = buffer.getvalue()
+        else:
+            data = render_cache.render_cache.render(key, fig, 'png')
+        stage.bytes = len(data)
+    clipboard.copy_png(data)
 
 
 if __name__ == '__main__':
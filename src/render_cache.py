@@ -0,0 +1,145 @@
+'''
+Rendered figures keyed by config, view and data fingerprints, in memory
+and optionally in `CSVIEWER_RENDER_CACHE_DIR`.
+'''
+import copy
+import hashlib
+import json
+import os
+import threading
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from fingerprint import fingerprint
+from memo import LRUCache
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+
+MAX_ENTRIES = int(os.environ.get('CSVIEWER_RENDER_CACHE_ENTRIES', 32))
+CACHE_DIR = os.environ.get('CSVIEWER_RENDER_CACHE_DIR')
+
+
+def normalize_config(config: Dict) -> Dict:
+    '''
+    Copy of a config in which equivalent settings are equal: unset limits
+    are None, sizes are floats and flags are booleans.
+    '''
+    config = copy.deepcopy(config)
+    for axis in ('axis_x', 'axis_y'):
+        if axis in config:
+            lim = config[axis].get('lim')
+            config[axis]['lim'] = [float(v) for v in lim] if lim else None
+    if 'figure' in config:
+        size = config['figure'].get('size') or []
+        config['figure']['size'] = [float(v) for v in size]
+        for key in ('grid_visible', 'legend_visible'):
+            config['figure'][key] = bool(config['figure'].get(key))
+    return config
+
+
+def make_key(
+        config: Dict, series: Sequence[Tuple[np.ndarray, np.ndarray]],
+        fmt: str, view: Dict = None) -> str:
+
+    text = json.dumps(
+        [normalize_config(config), fmt, view or {}],
+        sort_keys=True, default=str
+    )
+    arrays = [values for pair in series for values in pair]
+    digest = hashlib.blake2b(text.encode(), digest_size=16)
+    digest.update(fingerprint(*arrays).encode())
+    return digest.hexdigest()
+
+
+def get_view(fig: 'Figure') -> Dict:
+    return {
+        'size': [float(v) for v in fig.get_size_inches()],
+        'dpi': float(fig.dpi),
+        'limits': [
+            [float(v) for v in (*ax.get_xlim(), *ax.get_ylim())]
+            for ax in fig.axes
+        ],
+    }
+
+
+class RenderCache:
+    def __init__(
+            self, max_entries: int = MAX_ENTRIES,
+            directory: Optional[str] = CACHE_DIR):
+
+        self.memory = LRUCache(max_entries)
+        self.directory = Path(directory) if directory else None
+        self.disk_hits = 0
+        self.lock = threading.Lock()
+
+    def get_entry_path(self, key: str, fmt: str) -> Path:
+        return self.directory.joinpath(f'{key}.{fmt}')
+
+    def get(self, key: str, fmt: str) -> Optional[bytes]:
+        with self.lock:
+            data = self.memory.get(key)
+        if data is not None or self.directory is None:
+            return data
+        try:
+            data = self.get_entry_path(key, fmt).read_bytes()
+        except OSError:
+            return None
+        with self.lock:
+            self.disk_hits += 1
+            self.memory.put(key, data)
+        return data
+
+    def put(self, key: str, fmt: str, data: bytes):
+        with self.lock:
+            self.memory.put(key, data)
+        if self.directory is None:
+            return
+        entry = self.get_entry_path(key, fmt)
+        temp = entry.with_suffix(f'.{threading.get_ident()}.tmp')
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temp.write_bytes(data)
+            os.replace(temp, entry)
+        except OSError:
+            temp.unlink(missing_ok=True)
+
+    def render(
+            self, key: str, fig: 'Figure', fmt: str = 'png',
+            **kwargs) -> bytes:
+
+        data = self.get(key, fmt)
+        if data is None:
+            buffer = BytesIO()
+            fig.savefig(buffer, format=fmt, **kwargs)
+            data = buffer.getvalue()
+            self.put(key, fmt, data)
+        return data
+
+    def get_stats(self) -> Dict[str, float]:
+        '''
+        Lookups, hits per tier and misses; a disk hit is a memory miss.
+        '''
+        with self.lock:
+            lookups = self.memory.hits + self.memory.misses
+            hits = self.memory.hits + self.disk_hits
+            return {
+                'lookups': lookups,
+                'memory_hits': self.memory.hits,
+                'disk_hits': self.disk_hits,
+                'misses': lookups - hits,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'entries': len(self.memory),
+            }
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            self.disk_hits = 0
+
+
+render_cache = RenderCache()
@@ -0,0 +1,255 @@
+'''
+Row filters for the data pool tables, e.g.
+
+    TIME(SEC) >= 20 & TIME(SEC) < 21
+    20 <= TIME(SEC) <= 21 & ACCELERATION(G) > 0.3
+
+Clauses are `column op number` or `number op column op number`, with
+`<`, `<=`, `>`, `>=` or `==`, joined by `&`. Column names may be quoted
+with backticks.
+
+The most selective clause, estimated from a sample, is looked up and the
+others are checked on its matching rows. A column gets a sorted index the
+second time it drives a filter; until then it is scanned.
+'''
+import re
+from typing import Dict, List, Optional, Sequence, TypedDict, Union
+
+import numpy as np
+import pandas as pd
+
+import perf
+
+
+NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|[-+]?inf'
+COMPARISON = r'<=|>=|==|<|>'
+SINGLE_CLAUSE = re.compile(
+    rf'^(?P<column>.+?)\s*(?P<op>{COMPARISON})\s*(?P<value>{NUMBER})$'
+)
+SAMPLE_SIZE = 4096
+RANGE_CLAUSE = re.compile(
+    rf'^(?P<lower>{NUMBER})\s*(?P<lower_op><=|<)\s*(?P<column>.+?)'
+    rf'\s*(?P<upper_op><=|<)\s*(?P<upper>{NUMBER})$'
+)
+
+
+class Predicate(TypedDict):
+    column: str
+    lower: float
+    upper: float
+    include_lower: bool
+    include_upper: bool
+
+
+class Error(Exception):
+    '''Base class for exceptions in this module.'''
+    message = 'Invalid filter.'
+
+    def __init__(self, detail: str = ''):
+        super().__init__(detail)
+        if detail:
+            self.message = f'{self.message}\n{detail}'
+
+
+class FilterSyntaxError(Error):
+    '''Exception raised when a clause cannot be parsed.'''
+    message = 'A filter clause must look like "column > 1" or "0 <= column < 1".'
+
+
+class UnknownColumnError(Error):
+    '''Exception raised when a clause names a column which does not exist.'''
+    message = 'The filter names an unknown column.'
+
+
+class NonNumericColumnError(Error):
+    '''Exception raised when a clause names a column which is not numeric.'''
+    message = 'Only numeric columns can be filtered.'
+
+
+def find_column(name: str, columns: Sequence[str]) -> str:
+    name = name.strip()
+    if len(name) > 1 and name[0] == name[-1] == '`':
+        name = name[1:-1]
+    if name in columns:
+        return name
+    matches = [column for column in columns if column.lower() == name.lower()]
+    if len(matches) == 1:
+        return matches[0]
+    raise UnknownColumnError(name)
+
+
+def make_predicate(column: str, op: str, value: float) -> Predicate:
+    predicate: Predicate = {
+        'column': column,
+        'lower': -np.inf,
+        'upper': np.inf,
+        'include_lower': True,
+        'include_upper': True,
+    }
+    if op in ('>', '>=', '=='):
+        predicate['lower'] = value
+        predicate['include_lower'] = op != '>'
+    if op in ('<', '<=', '=='):
+        predicate['upper'] = value
+        predicate['include_upper'] = op != '<'
+    return predicate
+
+
+def parse_filter(text: str, columns: Sequence[str]) -> List[Predicate]:
+    columns = [str(column) for column in columns]
+    predicates = []
+    for clause in text.split('&'):
+        clause = clause.strip()
+        if not clause:
+            continue
+        match = RANGE_CLAUSE.match(clause)
+        if match is not None:
+            column = find_column(match['column'], columns)
+            predicates.append({
+                'column': column,
+                'lower': float(match['lower']),
+                'upper': float(match['upper']),
+                'include_lower': match['lower_op'] == '<=',
+                'include_upper': match['upper_op'] == '<=',
+            })
+            continue
+        match = SINGLE_CLAUSE.match(clause)
+        if match is None:
+            raise FilterSyntaxError(clause)
+        column = find_column(match['column'], columns)
+        predicates.append(
+            make_predicate(column, match['op'], float(match['value']))
+        )
+    return predicates
+
+
+class SortedIndex:
+    '''
+    Row positions of a column in the order of its values, NaN last.
+    '''
+    def __init__(self, values: np.ndarray):
+        self.order = np.argsort(values, kind='stable')
+        self.values = values[self.order]
+
+    def query(self, predicate: Predicate) -> np.ndarray:
+        return self.order[self.get_bounds(predicate)]
+
+    def count(self, predicate: Predicate) -> int:
+        bounds = self.get_bounds(predicate)
+        return bounds.stop - bounds.start
+
+    def get_bounds(self, predicate: Predicate) -> slice:
+        side_lower = 'left' if predicate['include_lower'] else 'right'
+        side_upper = 'right' if predicate['include_upper'] else 'left'
+        start = np.searchsorted(self.values, predicate['lower'], side=side_lower)
+        stop = np.searchsorted(self.values, predicate['upper'], side=side_upper)
+        return slice(int(start), max(int(stop), int(start)))
+
+
+def match_values(values: np.ndarray, predicate: Predicate) -> np.ndarray:
+    if predicate['include_lower']:
+        mask = values >= predicate['lower']
+    else:
+        mask = values > predicate['lower']
+    if predicate['include_upper']:
+        mask &= values <= predicate['upper']
+    else:
+        mask &= values < predicate['upper']
+    return mask
+
+
+class RowFilter:
+    '''
+    Filter state of one table: the frame, its sorted indexes and the rows
+    matching the current predicates, in table order. Rows appended to the
+    frame later are matched directly; the indexes are rebuilt only when
+    the predicates change.
+    '''
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.indexes: Dict[str, SortedIndex] = {}
+        self.indexed_rows = len(df)
+        self.scanned_columns = set()
+        self.predicates: List[Predicate] = []
+        self.rows: Optional[np.ndarray] = None
+
+    def get_values(
+            self, column: str,
+            positions: Union[slice, np.ndarray] = slice(None)) -> np.ndarray:
+
+        series = self.df[column]
+        if not pd.api.types.is_numeric_dtype(series.dtype):
+            raise NonNumericColumnError(column)
+        values = series.to_numpy(dtype='float64', na_value=np.nan)
+        return values[positions]
+
+    def get_index(self, column: str) -> Optional[SortedIndex]:
+        if len(self.df) != self.indexed_rows:
+            self.indexes = {}
+            self.indexed_rows = len(self.df)
+        return self.indexes.get(column)
+
+    def build_index(self, column: str) -> SortedIndex:
+        with perf.stage('build_index', 'gui') as stage:
+            self.indexes[column] = SortedIndex(self.get_values(column))
+            stage.rows = len(self.df)
+        return self.indexes[column]
+
+    def estimate(self, predicate: Predicate) -> float:
+        '''
+        Number of matching rows: exact with an index, otherwise estimated
+        from evenly spaced samples.
+        '''
+        index = self.get_index(predicate['column'])
+        if index is not None:
+            return index.count(predicate)
+        step = max(len(self.df) // SAMPLE_SIZE, 1)
+        sample = self.get_values(predicate['column'], slice(None, None, step))
+        if not len(sample):
+            return 0
+        return match_values(sample, predicate).mean() * len(self.df)
+
+    def query(self, predicate: Predicate) -> np.ndarray:
+        column = predicate['column']
+        index = self.get_index(column)
+        if index is None and column in self.scanned_columns:
+            index = self.build_index(column)
+        if index is not None:
+            return np.sort(index.query(predicate))
+        self.scanned_columns.add(column)
+        return np.flatnonzero(match_values(self.get_values(column), predicate))
+
+    @perf.timed('filter_rows', 'gui')
+    def apply(self, predicates: List[Predicate]) -> Optional[np.ndarray]:
+        '''
+        Rows matching all predicates in ascending order, or None without
+        predicates, i.e. all rows.
+        '''
+        self.predicates = predicates
+        if not predicates:
+            self.rows = None
+            return self.rows
+        estimates = [self.estimate(predicate) for predicate in predicates]
+        best = int(np.argmin(estimates))
+        rows = self.query(predicates[best])
+        for idx, predicate in enumerate(predicates):
+            if idx != best and len(rows):
+                values = self.get_values(predicate['column'], rows)
+                rows = rows[match_values(values, predicate)]
+        self.rows = rows
+        return self.rows
+
+    def extend(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        '''
+        Swap in a longer version of the frame and add its new matching rows.
+        '''
+        start = len(self.df)
+        self.df = df
+        if self.rows is None or len(df) <= start:
+            return self.rows
+        mask = np.ones(len(df) - start, dtype=bool)
+        for predicate in self.predicates:
+            values = self.get_values(predicate['column'], slice(start, None))
+            mask &= match_values(values, predicate)
+        self.rows = np.concatenate([self.rows, start + np.flatnonzero(mask)])
+        return self.rows
@@ -0,0 +1,177 @@
+'''
+Session files: MAGIC, the frames as aligned Arrow IPC files, a JSON
+header and a trailer with its offset and length, then MAGIC again.
+'''
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, TypedDict
+
+import pandas as pd
+
+import perf
+
+
+MAGIC = b'CSVIEWER-SESSION'
+VERSION = 1
+ALIGNMENT = 64
+SUFFIX = '.csvsession'
+TRAILER = struct.Struct('<QQ')
+
+
+class CsvIdentity(TypedDict):
+    path: str
+    size: int
+    mtime_ns: int
+
+
+class FrameEntry(TypedDict):
+    offset: int
+    length: int
+
+
+class SessionHeader(TypedDict):
+    version: int
+    csv_paths: Dict[str, str]
+    identities: Dict[str, Optional[CsvIdentity]]
+    frames: Dict[str, Optional[FrameEntry]]
+    stats: Dict[str, Dict]
+    state: Dict
+
+
+class Error(Exception):
+    '''Base class for exceptions in this module.'''
+    pass
+
+
+class InvalidSessionError(Error):
+    '''Exception raised when a file is not a session or is damaged.'''
+    message = 'The file is not a session or it is damaged.'
+
+
+class VersionError(Error):
+    '''Exception raised when a session was written by a newer version.'''
+    message = 'The session was saved by a newer version of CSViewer.'
+
+
+def get_identity(path: str) -> Optional[CsvIdentity]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {
+        'path': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+
+
+def is_changed(identity: Optional[CsvIdentity]) -> bool:
+    '''
+    Whether a CSV file changed since saving; a deleted file did not.
+    '''
+    if identity is None:
+        return False
+    current = get_identity(identity['path'])
+    return current is not None and (
+        current['size'] != identity['size']
+        or current['mtime_ns'] != identity['mtime_ns']
+    )
+
+
+def write_padding(f):
+    f.write(b'\0' * (-f.tell() % ALIGNMENT))
+
+
+def write_frame(f, df: pd.DataFrame) -> FrameEntry:
+    import pyarrow as pa
+
+    write_padding(f)
+    offset = f.tell()
+    table = pa.Table.from_pandas(df)
+    with pa.ipc.new_file(f, table.schema) as writer:
+        writer.write_table(table)
+    return {'offset': offset, 'length': f.tell() - offset}
+
+
+@perf.timed('save_session', 'session')
+def save(
+        path: str, csv_paths: Dict[str, str],
+        data_pool: Dict[str, Optional[pd.DataFrame]],
+        stats: Dict[str, Dict], state: Dict):
+    '''
+    Write a session. Frames which are None are re-imported on load.
+    '''
+    path = Path(path)
+    temp = path.with_suffix(f'{path.suffix}.tmp')
+    header: SessionHeader = {
+        'version': VERSION,
+        'csv_paths': csv_paths,
+        'identities': {},
+        'frames': {},
+        'stats': stats,
+        'state': state,
+    }
+    try:
+        with open(temp, 'wb') as f:
+            f.write(MAGIC)
+            for name, csv_path in csv_paths.items():
+                header['identities'][name] = get_identity(csv_path)
+                df = data_pool.get(name)
+                header['frames'][name] = None if df is None else write_frame(f, df)
+            offset = f.tell()
+            data = json.dumps(header).encode()
+            f.write(data)
+            f.write(TRAILER.pack(offset, len(data)))
+            f.write(MAGIC)
+            perf.count(nbytes=f.tell())
+        os.replace(temp, path)
+    finally:
+        temp.unlink(missing_ok=True)
+
+
+def read_header(buffer) -> SessionHeader:
+    size = len(MAGIC) + TRAILER.size
+    if buffer.size < len(MAGIC) + size:
+        raise InvalidSessionError
+    if buffer.slice(0, len(MAGIC)).to_pybytes() != MAGIC:
+        raise InvalidSessionError
+    trailer = buffer.slice(buffer.size - size, size).to_pybytes()
+    if trailer[TRAILER.size:] != MAGIC:
+        raise InvalidSessionError
+    offset, length = TRAILER.unpack(trailer[:TRAILER.size])
+    try:
+        header = json.loads(buffer.slice(offset, length).to_pybytes())
+    except ValueError:
+        raise InvalidSessionError
+    if header.get('version', 0) > VERSION:
+        raise VersionError
+    return header
+
+
+@perf.timed('open_session', 'session')
+def load(path: str) -> Tuple[SessionHeader, Dict[str, pd.DataFrame], List[str]]:
+    '''
+    Header, frames and the names of the CSV files changed since saving,
+    whose frames are left out like those of lazily imported files.
+    '''
+    import pyarrow as pa
+
+    try:
+        buffer = pa.memory_map(str(path), 'r').read_buffer()
+    except OSError:
+        raise InvalidSessionError
+    header = read_header(buffer)
+    data_pool = {}
+    changed = []
+    for name, entry in header['frames'].items():
+        if is_changed(header['identities'][name]):
+            changed.append(name)
+        elif entry is not None:
+            frame = buffer.slice(entry['offset'], entry['length'])
+            table = pa.ipc.open_file(frame).read_all()
+            # separate blocks keep numeric columns as views into the map
+            data_pool[name] = table.to_pandas(split_blocks=True)
+    perf.count(nbytes=buffer.size)
+    return header, data_pool, changed
@@ -0,0 +1,119 @@
+import os
+from io import BytesIO
+from typing import Dict, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+import csv_reader
+
+
+class CsvTail:
+    '''
+    Follows a growing CSV file, parsing only the complete lines appended
+    since the previous poll. With `unterminated`, the next row replaces
+    the frame's last one.
+    '''
+    def __init__(
+            self, path: str, dtypes: Mapping[str, np.dtype], offset: int,
+            unterminated: bool = False):
+
+        schema = csv_reader.schema_cache.get(path)
+        self.path = path
+        self.dtypes = dict(dtypes)
+        self.columns = list(self.dtypes)
+        self.options = {
+            'sep': schema['delimiter'],
+            'decimal': schema['decimal'],
+        }
+        self.offset = offset
+        self.unterminated = unterminated
+        self.skipped_rows = 0
+
+    def poll(self) -> Optional[pd.DataFrame]:
+        size = os.path.getsize(self.path)
+        if size <= self.offset:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        end = data.rfind(b'\n')
+        if end < 0:
+            return None
+        self.offset += end + 1
+        block = data[:end + 1]
+        if not block.strip():
+            return None
+        df = pd.read_csv(
+            BytesIO(block), header=None, names=self.columns, **self.options
+        )
+        return self.convert(df)
+
+    def convert(self, df: pd.DataFrame) -> pd.DataFrame:
+        '''
+        Cast to the frame's numeric dtypes, dropping rows which do not fit.
+        '''
+        is_valid = np.ones(len(df), dtype=bool)
+        for column, dtype in self.dtypes.items():
+            values = df[column]
+            if dtype.kind not in 'fiu' or values.dtype.kind in 'fiu':
+                continue
+            text = values.astype(str).str.replace(
+                self.options['decimal'], '.', regex=False
+            )
+            numbers = pd.to_numeric(text, errors='coerce')
+            is_valid &= (numbers.notna() | values.isna()).to_numpy()
+            df[column] = numbers
+        self.skipped_rows += int(len(df) - is_valid.sum())
+        df = df[is_valid]
+        return df.astype({
+            column: dtype for column, dtype in self.dtypes.items()
+            if dtype.kind == 'f'
+        })
+
+
+class AppendableFrame:
+    '''
+    Column buffers with spare capacity, so appending copies only new rows.
+    '''
+    GROWTH = 1.5
+
+    def __init__(self, df: pd.DataFrame):
+        self.columns = list(df.columns)
+        self.rows = len(df)
+        capacity = int(self.rows * self.GROWTH) + 1024
+        self.buffers: Dict[str, np.ndarray] = {}
+        for column in self.columns:
+            values = df[column].to_numpy()
+            buffer = np.empty(capacity, dtype=values.dtype)
+            buffer[:self.rows] = values
+            self.buffers[column] = buffer
+
+    def append(self, df: pd.DataFrame, replace_last: bool = False) -> pd.DataFrame:
+        if replace_last:
+            self.rows = max(self.rows - 1, 0)
+        rows = self.rows + len(df)
+        for column in self.columns:
+            values = df[column].to_numpy()
+            buffer = self.buffers[column]
+            if buffer.dtype.kind in 'fiu' and values.dtype.kind not in 'fiub':
+                raise ValueError(f'Non-numeric values appended to {column}.')
+            if buffer.dtype.kind == 'f' and values.dtype.kind in 'fiu':
+                # new rows are parsed as float64; keep compacted columns
+                dtype = buffer.dtype
+            else:
+                dtype = np.result_type(buffer.dtype, values.dtype)
+            if rows > len(buffer) or dtype != buffer.dtype:
+                capacity = max(rows, int(len(buffer) * self.GROWTH))
+                grown = np.empty(capacity, dtype=dtype)
+                grown[:self.rows] = buffer[:self.rows]
+                self.buffers[column] = buffer = grown
+            buffer[self.rows:rows] = values
+        self.rows = rows
+        return self.get_frame()
+
+    def get_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {column: self.buffers[column][:self.rows] for column in self.columns},
+            copy=False
+        )
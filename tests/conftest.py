@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+
+# keep the caches of the tests out of the user's ~/.csviewer
+CACHE_ROOT = tempfile.mkdtemp(prefix='csviewer-tests-')
+os.environ.setdefault('CSVIEWER_CACHE_DIR', os.path.join(CACHE_ROOT, 'cache'))
+os.environ.setdefault('CSVIEWER_STORE_DIR', os.path.join(CACHE_ROOT, 'store'))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1].joinpath('src')))
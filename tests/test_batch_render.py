@@ -0,0 +1,17 @@
+import json
+
+import batch_render
+
+
+def test_bad_config_is_reported_as_failed(tmp_path, capsys):
+    broken = tmp_path.joinpath('broken.json')
+    broken.write_text('{"data": ')
+    missing = tmp_path.joinpath('missing.json')
+    missing.write_text(json.dumps({'figure': {}}))
+
+    status = batch_render.main([
+        str(broken), str(missing), '--output-dir', str(tmp_path), '--workers', '1'
+    ])
+    output = capsys.readouterr().out
+    assert status == 1
+    assert output.count('failed (') == 2
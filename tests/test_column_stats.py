@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import column_stats
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(5)
+    return pd.DataFrame({
+        'time': np.arange(1000) * 0.01,
+        'acc': rng.normal(size=1000),
+        'level': np.where(rng.random(1000) < 0.1, np.nan, rng.uniform(1, 2, 1000)),
+        'down': np.arange(1000, 0, -1),
+        'name': rng.choice(['a', None], 1000),
+    })
+
+
+def reference(df):
+    stats = {}
+    for column in df.columns:
+        series = df[column]
+        entry = {'count': len(series), 'nan_count': int(series.isna().sum())}
+        if pd.api.types.is_numeric_dtype(series):
+            values = series.to_numpy(dtype='float64')
+            steps = np.diff(values)
+            entry.update({
+                'min': np.nanmin(values),
+                'max': np.nanmax(values),
+                'is_increasing': bool(np.all(steps >= 0)),
+                'is_decreasing': bool(np.all(steps <= 0)),
+                'is_positive': not np.any(values <= 0),
+            })
+        stats[column] = entry
+    return stats
+
+
+def test_stats_match_pandas(df, monkeypatch):
+    monkeypatch.setattr(column_stats, 'BLOCK_ROWS', 64)
+    stats = column_stats.StatsAccumulator.from_dataframe(df).get_stats()
+    for column, expected in reference(df).items():
+        for name, value in expected.items():
+            assert stats[column][name] == pytest.approx(value), (column, name)
+    assert stats['name']['min'] is None
+
+
+def test_appended_rows_match_one_pass(df, monkeypatch):
+    monkeypatch.setattr(column_stats, 'BLOCK_ROWS', 64)
+    accumulator = column_stats.StatsAccumulator.from_dataframe(df.iloc[:300])
+    accumulator.update(df.iloc[300:700])
+    restored = column_stats.StatsAccumulator.from_dict(accumulator.to_dict())
+    restored.update(df.iloc[700:])
+    whole = column_stats.StatsAccumulator.from_dataframe(df)
+    assert restored.get_stats() == whole.get_stats()
+
+
+def test_field_range():
+    stats = [{'min': 1.0, 'max': 2.0}, {'min': None, 'max': None}, {'min': -1.0, 'max': 0.5}]
+    assert column_stats.get_field_range(stats) == [-1.0, 2.0]
+    assert column_stats.get_field_range(stats[1:2]) is None
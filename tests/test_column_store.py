@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from column_store import ColumnStore
+
+
+def make_chunks(rows):
+    return [pd.DataFrame({'a': np.arange(rows, dtype='float64')})]
+
+
+def test_newer_version_replaces_stale_entry(tmp_path):
+    store = ColumnStore(tmp_path.joinpath('store'))
+    source = tmp_path.joinpath('data.csv')
+    source.write_text('a\n1\n')
+    store.write('old', make_chunks(10), source=str(source))
+    source.write_text('a\n1\n2\n')
+    store.write('new', make_chunks(20), source=str(source))
+    assert not store.has('old')
+    assert store.load('new')['a'].tolist() == list(range(20))
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    store = ColumnStore(tmp_path.joinpath('store'), max_bytes=2500)
+    for idx, key in enumerate(('first', 'second')):
+        store.write(key, make_chunks(100))
+        os.utime(store.get_entry_dir(key).joinpath('manifest.json'), (idx, idx))
+    store.load('first')
+    store.write('third', make_chunks(100))
+    assert store.has('first') and store.has('third')
+    assert not store.has('second')
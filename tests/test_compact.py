@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+import compact
+
+
+def test_downcasts_keep_values():
+    rng = np.random.default_rng(4)
+    df = pd.DataFrame({
+        'acc': rng.normal(size=1000),
+        'count': np.arange(1000, dtype='int64'),
+        'channel': rng.choice(['UP', 'NS', 'EW'], 1000),
+        'epoch': 1.7e9 + np.arange(1000) * 0.001,
+        'name': [f'run-{idx}' for idx in range(1000)],
+    })
+    compacted, before, after = compact.compact_dataframe(df)
+
+    assert compacted['acc'].dtype == np.float32
+    assert np.allclose(compacted['acc'], df['acc'], rtol=1e-6)
+    assert compacted['count'].dtype == np.int16
+    assert np.array_equal(compacted['count'], df['count'])
+    assert isinstance(compacted['channel'].dtype, pd.CategoricalDtype)
+    assert compacted['channel'].astype(str).tolist() == df['channel'].tolist()
+    # float32 cannot resolve milliseconds of epoch seconds
+    assert compacted['epoch'].dtype == np.float64
+    # unique text is not worth a categorical
+    assert compacted['name'].dtype == df['name'].dtype
+    assert after < before
+
+
+def test_float32_safety():
+    assert compact.is_float32_safe(np.array([0.1, 0.2, np.nan, 0.3]))
+    assert compact.is_float32_safe(np.array([np.nan, np.nan]))
+    assert not compact.is_float32_safe(np.array([1e39, 1.0]))
+    assert not compact.is_float32_safe(1.7e9 + np.arange(10) * 0.001)
@@ -0,0 +1,59 @@
+import csv_reader
+
+
+def write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_family_keeps_versions_apart():
+    family = csv_reader.get_file_family
+    assert family('data/elcentro_UP.csv') == family('data/elcentro_NS.csv')
+    assert family('data/elcentro_UP.csv.gz') == family('data/elcentro_EW.csv.gz')
+    assert family('data/data-2023_v1.csv') != family('data/data-2023_v2.csv')
+
+
+def test_sibling_with_same_layout_reuses_schema(tmp_path):
+    cache = csv_reader.SchemaCache()
+    seed = write(tmp_path.joinpath('run_UP.csv'), 'time,acc\n0.0,1.5\n0.1,2.5\n')
+    sibling = write(tmp_path.joinpath('run_NS.csv'), 'time,acc\n0.0,3.5\n0.1,4.5\n')
+    assert cache.get(sibling) is cache.get(seed)
+
+
+def test_sibling_with_other_width_is_sniffed(tmp_path):
+    cache = csv_reader.SchemaCache()
+    seed = write(tmp_path.joinpath('run_UP.csv'), 'time,acc\n0.0,1.5\n0.1,2.5\n')
+    sibling = write(
+        tmp_path.joinpath('run_NS.csv'), 'time,acc,vel\n0.0,3.5,1.0\n0.1,4.5,2.0\n'
+    )
+    cache.get(seed)
+    assert cache.get(sibling)['columns'] == ['time', 'acc', 'vel']
+    assert cache.get(seed)['columns'] == ['time', 'acc']
+
+
+def test_sibling_with_other_delimiter_is_sniffed(tmp_path):
+    cache = csv_reader.SchemaCache()
+    seed = write(tmp_path.joinpath('run_UP.csv'), 'time,acc\n0.0,1.5\n0.1,2.5\n')
+    sibling = write(tmp_path.joinpath('run_NS.csv'), 'time;acc\n0.0;3.5\n0.1;4.5\n')
+    cache.get(seed)
+    schema = cache.get(sibling)
+    assert schema['delimiter'] == ';'
+    assert csv_reader.read_csv(sibling, use_cache=False)['acc'].tolist() == [3.5, 4.5]
+
+
+def test_sibling_with_header_after_headerless_seed(tmp_path):
+    cache = csv_reader.SchemaCache()
+    seed = write(tmp_path.joinpath('run_UP.csv'), '0.0,1.5\n0.1,2.5\n0.2,3.5\n')
+    sibling = write(tmp_path.joinpath('run_NS.csv'), 'time,acc\n0.0,3.5\n0.1,4.5\n')
+    assert not cache.get(seed)['has_header']
+    assert cache.get(sibling)['columns'] == ['time', 'acc']
+
+
+def test_headerless_sibling_after_seed_with_header(tmp_path):
+    cache = csv_reader.SchemaCache()
+    seed = write(tmp_path.joinpath('run_UP.csv'), 'time,acc\n0.0,1.5\n0.1,2.5\n')
+    sibling = write(tmp_path.joinpath('run_NS.csv'), '0.0,3.5\n0.1,4.5\n0.2,5.5\n')
+    assert cache.get(seed)['has_header']
+    schema = cache.get(sibling)
+    assert not schema['has_header']
+    assert len(csv_reader.read_csv(sibling, schema, use_cache=False)) == 3
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from custom_widgets import VirtualTreeview
+
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_extend_permutation_matches_full_sort(descending):
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 20, 500).astype('float64')
+    values[rng.choice(500, 30, replace=False)] = np.nan
+    # merges the permutation without a Tk window
+    treeview = VirtualTreeview.__new__(VirtualTreeview)
+    treeview.dataframe = pd.DataFrame({'a': values[:300]})
+    permutation = np.argsort(treeview.get_sort_values('a', descending), kind='stable')
+
+    treeview.dataframe = pd.DataFrame({'a': values})
+    merged = treeview.extend_permutation(permutation, 'a', descending, 300)
+    expected = np.argsort(treeview.get_sort_values('a', descending), kind='stable')
+    assert np.array_equal(merged, expected)
+
+
+@pytest.mark.parametrize('delta, units', [
+    (120, -3), (-240, 6), (1, -3), (-2, 3), (0, 0),
+])
+def test_mousewheel_scrolls_for_small_deltas(delta, units):
+    scrolled = []
+    treeview = VirtualTreeview.__new__(VirtualTreeview)
+    treeview.scroll_rows = scrolled.append
+    event = type('Event', (), {'delta': delta})()
+    assert treeview.on_mousewheel(event) == 'break'
+    assert scrolled == [units]
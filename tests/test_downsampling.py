@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+import downsampling
+
+
+def minmax_reference(y, budget):
+    n = len(y)
+    buckets = max(budget // 2, 1)
+    size = -(-n // buckets)
+    kept = {0, n - 1}
+    for start in range(0, n, size):
+        bucket = [(value, idx) for idx, value in enumerate(y[start:start + size], start)
+                  if not np.isnan(value)]
+        if bucket:
+            kept.add(min(bucket)[1])
+            kept.add(min((-value, idx) for value, idx in bucket)[1])
+        else:
+            kept.add(start)
+    return sorted(kept)
+
+
+def lttb_reference(x, y, budget):
+    n = len(y)
+    edges = [int(edge) for edge in np.linspace(1, n - 1, budget - 1)]
+    y = [0.0 if np.isnan(value) else value for value in y]
+    kept = [0]
+    for bucket in range(budget - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = max(edges[bucket + 2], stop + 1) if bucket + 2 < len(edges) else n
+        mean_x = sum(x[stop:next_stop]) / (next_stop - stop)
+        mean_y = sum(y[stop:next_stop]) / (next_stop - stop)
+        a = kept[-1]
+        best, best_area = start, -1.0
+        for idx in range(start, stop):
+            area = abs((x[a] - mean_x) * (y[idx] - y[a]) - (x[a] - x[idx]) * (mean_y - y[a]))
+            if area > best_area:
+                best, best_area = idx, area
+        kept.append(best)
+    kept.append(n - 1)
+    return sorted(set(kept))
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(2)
+    x = np.cumsum(rng.uniform(0.5, 1.5, 2000))
+    y = np.cumsum(rng.normal(size=2000))
+    y[rng.choice(2000, 40, replace=False)] = np.nan
+    return x, y
+
+
+@pytest.mark.parametrize('budget', [10, 101, 500])
+def test_minmax_matches_brute_force(series, budget):
+    _, y = series
+    assert downsampling.minmax_indices(y, budget).tolist() == minmax_reference(y, budget)
+
+
+@pytest.mark.parametrize('budget', [10, 101, 500])
+def test_lttb_matches_brute_force(series, budget):
+    x, y = series
+    assert downsampling.lttb_indices(x, y, budget).tolist() == lttb_reference(x, y, budget)
+
+
+@pytest.mark.parametrize('method', ['minmax', 'lttb'])
+def test_decimate_keeps_peaks_and_ends(series, method):
+    x, y = series
+    x_kept, y_kept = downsampling.decimate(x, y, 200, method)
+    assert len(x_kept) <= 202
+    assert x_kept[0] == x[0] and x_kept[-1] == x[-1]
+    if method == 'minmax':
+        assert np.nanmax(y_kept) == np.nanmax(y)
+        assert np.nanmin(y_kept) == np.nanmin(y)
+
+
+def test_short_series_are_not_decimated(series):
+    x, y = series
+    for method in downsampling.DECIMATION_METHODS:
+        x_kept, y_kept = downsampling.decimate(x, y, len(y), method)
+        assert x_kept is not None and len(x_kept) == len(x)
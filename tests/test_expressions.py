@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+import expressions
+
+
+def test_constant_expression_has_requested_length():
+    df = pd.DataFrame({'a': [1.0, 2.0, 3.0]})
+    assert expressions.evaluate('2 * g', df, {}, 3).shape == (3,)
+    assert expressions.evaluate('2 * g', df, {}, 5).shape == (5,)
+
+
+def test_column_expression():
+    df = pd.DataFrame({'a': [1.0, 2.0, 3.0]})
+    result = expressions.evaluate('a * 2', df, {}, 3)
+    assert np.array_equal(result, [2.0, 4.0, 6.0])
+
+
+def test_compiled_expressions_are_bounded():
+    for idx in range(expressions.CACHE_SIZE * 2):
+        expressions.compile_expression(f'a + {idx}')
+    assert expressions.compile_expression.cache_info().currsize <= expressions.CACHE_SIZE
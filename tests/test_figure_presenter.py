@@ -0,0 +1,86 @@
+import copy
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import plotting
+
+
+def make_frame(rows, offset=0.0):
+    x = np.arange(rows, dtype='float64')
+    return pd.DataFrame({'t': x, 'a': np.sin(x) + offset})
+
+
+@pytest.fixture
+def config():
+    config = plotting.get_initial_configuration()
+    config['data']['labels'] = ['one', 'two']
+    config['data']['fieldnames'] = [{'x': 't', 'y': 'a'}, {'x': 't', 'y': 'a'}]
+    config['figure'].update(size=[4.0, 3.0], legend_visible=True)
+    for axis in ('axis_x', 'axis_y'):
+        config[axis].update(scale='linear', lim=None)
+    return config
+
+
+@pytest.fixture
+def presenter():
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return plotting.FigurePresenter(fig)
+
+
+def test_unchanged_update_is_skipped(presenter, config, monkeypatch):
+    data_pool = [make_frame(100), make_frame(100, 1.0)]
+    presenter.update(config, data_pool)
+    calls = []
+    monkeypatch.setattr(presenter, 'update_lines', lambda *args: calls.append(args))
+    presenter.update(copy.deepcopy(config), list(data_pool))
+    assert calls == []
+    assert presenter.is_unchanged(config, data_pool)
+
+
+def test_style_changes_keep_the_lines(presenter, config):
+    data_pool = [make_frame(100), make_frame(100, 1.0)]
+    presenter.update(config, data_pool)
+    lines = [viewport_line.line for viewport_line in presenter.viewport_lines]
+    config['data']['labels'] = ['three', 'four']
+    config['axis_y']['lim'] = [-5.0, 5.0]
+    config['axis_x']['lim'] = [0.0, 50.0]
+    presenter.update(config, data_pool)
+    assert [viewport_line.line for viewport_line in presenter.viewport_lines] == lines
+    assert [line.get_label() for line in lines] == ['three', 'four']
+    assert presenter.ax.get_ylim() == (-5.0, 5.0)
+
+
+def test_new_data_reuses_lines_and_removes_extra_ones(presenter, config):
+    presenter.update(config, [make_frame(100), make_frame(100, 1.0)])
+    first = presenter.viewport_lines[0].line
+    config['data']['labels'] = ['one']
+    config['data']['fieldnames'] = config['data']['fieldnames'][:1]
+    presenter.update(config, [make_frame(200, 2.0)])
+    assert presenter.viewport_lines[0].line is first
+    assert len(presenter.ax.lines) == 1
+    assert np.array_equal(first.get_ydata(), np.sin(np.arange(200.0)) + 2.0)
+
+
+def test_refresh_with_fixed_limits_blits_extended_lines(presenter, config, monkeypatch):
+    config['axis_x']['lim'] = [0.0, 500.0]
+    config['axis_y']['lim'] = [-2.0, 3.0]
+    data_pool = [make_frame(100), make_frame(100, 1.0)]
+    presenter.update(config, data_pool)
+    presenter.set_animated(True)
+    presenter.fig.canvas.draw()
+    assert presenter.background is not None
+    blits = []
+    monkeypatch.setattr(presenter.fig.canvas, 'blit', blits.append)
+    monkeypatch.setattr(presenter.fig.canvas, 'draw', lambda: pytest.fail('redrawn'))
+
+    presenter.refresh_data([make_frame(300), data_pool[1]])
+    assert len(blits) == 1
+    assert len(presenter.viewport_lines[0].line.get_xdata()) == 300
+    assert len(presenter.viewport_lines[1].line.get_xdata()) == 100
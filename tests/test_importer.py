@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import csv_reader
+import importer
+import tail
+
+
+def follow(path, job, df):
+    follower = tail.CsvTail(
+        str(path), df.dtypes, job.offsets['growing'], job.unterminated['growing']
+    )
+    frame = tail.AppendableFrame(df)
+    replace_last = follower.unterminated
+    appended = follower.poll()
+    return follower, frame.append(appended, replace_last)
+
+
+@pytest.mark.parametrize('mode', ['memory', 'mmap'])
+def test_last_line_without_newline_is_imported(tmp_path, mode):
+    path = tmp_path.joinpath('data.csv')
+    path.write_text('x,y\n1.0,2.0\n3.0,4.0')
+    df, = importer.ImportJob({'data': str(path)}, mode, max_workers=1).wait()
+    assert df.to_numpy().tolist() == pd.read_csv(path).to_numpy().tolist()
+    assert len(df) == 2
+
+
+def test_sample_files_are_imported_completely():
+    paths = sorted(Path(__file__).parents[1].glob('data/*/*.csv'))
+    job = importer.ImportJob({str(idx): str(p) for idx, p in enumerate(paths)})
+    for path, df in zip(paths, job.wait()):
+        has_header = csv_reader.schema_cache.get(str(path))['has_header']
+        assert len(df) == len(path.read_text().splitlines()) - has_header
+
+
+def test_append_during_import(tmp_path, monkeypatch):
+    path = tmp_path.joinpath('growing.csv')
+    path.write_text('x,y\n1.0,2.0\n3.0,4')
+    load_csv = csv_reader.load_csv
+
+    def append_then_load(*args, **kwargs):
+        # the writer finishes the partial line and adds a row mid-import
+        with open(path, 'a') as f:
+            f.write('.5\n5.0,6.0\n')
+        return load_csv(*args, **kwargs)
+
+    monkeypatch.setattr(csv_reader, 'load_csv', append_then_load)
+    job = importer.ImportJob({'growing': str(path)}, max_workers=1)
+    df, = job.wait()
+    assert df.to_numpy().tolist() == [[1.0, 2.0], [3.0, 4.0]]
+
+    _, followed = follow(path, job, df)
+    assert followed.to_numpy().tolist() == [[1.0, 2.0], [3.0, 4.5], [5.0, 6.0]]
+
+
+def test_rows_which_are_not_numbers_are_skipped(tmp_path):
+    path = tmp_path.joinpath('growing.csv')
+    path.write_text('x,y\n1.0,2.0\n')
+    job = importer.ImportJob({'growing': str(path)}, max_workers=1)
+    df, = job.wait()
+    with open(path, 'a') as f:
+        f.write('3.0,-2.4472800e-00353.48\n5.0,6.0\n')
+
+    follower, followed = follow(path, job, df)
+    assert followed.to_numpy().tolist() == [[1.0, 2.0], [5.0, 6.0]]
+    assert followed['y'].dtype == df['y'].dtype
+    assert follower.skipped_rows == 1
@@ -0,0 +1,47 @@
+import gzip
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import overview
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(3)
+    x = np.arange(5000) * 0.01
+    return pd.DataFrame({'time': x, 'acc': rng.normal(size=5000).round(4)})
+
+
+def write(tmp_path, df, suffix):
+    path = tmp_path.joinpath(f'record{suffix}')
+    text = df.to_csv(index=False).encode()
+    path.write_bytes(gzip.compress(text) if suffix.endswith('.gz') else text)
+    return str(path)
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.csv.gz'])
+def test_buckets_match_groupby(tmp_path, frame, suffix):
+    path = write(tmp_path, frame, suffix)
+    buckets = overview.build_overview(path, 'time', 'acc', 1.0, chunk_bytes=4096)
+
+    bucket = np.floor((frame['time'] - frame['time'][0]) / 1.0)
+    expected = frame.groupby(bucket).agg(
+        x_min=('time', 'min'), x_max=('time', 'max'),
+        y_min=('acc', 'min'), y_max=('acc', 'max'),
+        y_mean=('acc', 'mean'), count=('acc', 'count'),
+    ).reset_index(drop=True)
+    for column in expected.columns:
+        assert np.allclose(buckets[column], expected[column]), column
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.csv.gz'])
+def test_read_buckets_returns_their_rows(tmp_path, frame, suffix):
+    path = write(tmp_path, frame, suffix)
+    buckets = overview.build_overview(path, 'time', 'acc', 1.0, chunk_bytes=4096)
+    rows = overview.read_buckets(path, buckets, 10, 12)
+    lower, upper = buckets['x_min'][10], buckets['x_max'][12]
+    expected = frame[(frame['time'] >= lower) & (frame['time'] <= upper)]
+    assert np.allclose(rows['time'], expected['time'])
+    assert np.allclose(rows['acc'], expected['acc'])
@@ -0,0 +1,60 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+from matplotlib.figure import Figure
+
+import render_cache
+
+
+SERIES = [(np.arange(10.0), np.arange(10.0) ** 2)]
+
+
+def make_config(**figure):
+    return {
+        'figure': {'size': [4, 3], 'grid_visible': 0, 'legend_visible': 1, **figure},
+        'axis_x': {'lim': []},
+        'axis_y': {'lim': [0, 1]},
+    }
+
+
+def test_equivalent_configs_share_a_key():
+    key = render_cache.make_key(make_config(), SERIES, 'png')
+    config = make_config(size=[4.0, 3.0], grid_visible=False, legend_visible=True)
+    config['axis_x']['lim'] = None
+    config['axis_y']['lim'] = [0.0, 1.0]
+    assert render_cache.make_key(config, SERIES, 'png') == key
+    copied = [(x.copy(), y.copy()) for x, y in SERIES]
+    assert render_cache.make_key(make_config(), copied, 'png') == key
+
+
+def test_content_format_and_view_change_the_key():
+    key = render_cache.make_key(make_config(), SERIES, 'png')
+    changed = [(SERIES[0][0], SERIES[0][1] + 1)]
+    assert render_cache.make_key(make_config(), changed, 'png') != key
+    assert render_cache.make_key(make_config(), SERIES, 'svg') != key
+    assert render_cache.make_key(make_config(), SERIES, 'png', {'dpi': 200}) != key
+    assert render_cache.make_key(make_config(grid_visible=True), SERIES, 'png') != key
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = render_cache.RenderCache(max_entries=2, directory=None)
+    cache.put('a', 'png', b'a')
+    cache.put('b', 'png', b'b')
+    assert cache.get('a', 'png') == b'a'
+    cache.put('c', 'png', b'c')
+    assert cache.get('b', 'png') is None
+    assert cache.get('a', 'png') == b'a' and cache.get('c', 'png') == b'c'
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    cache = render_cache.RenderCache(directory=str(tmp_path))
+    fig = Figure()
+    fig.add_subplot().plot(*SERIES[0])
+    data = cache.render('key', fig, 'png')
+    assert data.startswith(b'\x89PNG')
+    assert cache.render('key', None, 'png') == data
+
+    reopened = render_cache.RenderCache(directory=str(tmp_path))
+    assert reopened.get('key', 'png') == data
+    stats = reopened.get_stats()
+    assert stats['disk_hits'] == 1 and stats['misses'] == 0
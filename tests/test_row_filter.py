@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import row_filter
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=(5000, 2)).round(2)
+    values[rng.choice(5000, 100, replace=False), 1] = np.nan
+    return pd.DataFrame(values, columns=['TIME(SEC)', 'ACC'])
+
+
+def reference(df, text):
+    mask = np.ones(len(df), dtype=bool)
+    for predicate in row_filter.parse_filter(text, df.columns):
+        values = df[predicate['column']].to_numpy()
+        mask &= row_filter.match_values(values, predicate)
+    return np.flatnonzero(mask)
+
+
+QUERIES = [
+    'TIME(SEC) >= 0.5',
+    '-0.2 < TIME(SEC) <= 0.2 & ACC > 1',
+    '`ACC` == 0.1',
+    'acc < -1 & time(sec) > 0',
+    'ACC > 10',
+]
+
+
+@pytest.mark.parametrize('text', QUERIES)
+def test_filter_matches_boolean_mask(df, text):
+    rows_filter = row_filter.RowFilter(df)
+    predicates = row_filter.parse_filter(text, df.columns)
+    for _ in range(3):
+        # scanned first, looked up in an index afterwards
+        assert np.array_equal(rows_filter.apply(predicates), reference(df, text))
+
+
+def test_only_the_driving_column_is_indexed(df):
+    rows_filter = row_filter.RowFilter(df)
+    predicates = row_filter.parse_filter('TIME(SEC) > -5 & ACC > 2', df.columns)
+    rows_filter.apply(predicates)
+    assert rows_filter.indexes == {}
+    rows_filter.apply(predicates)
+    assert list(rows_filter.indexes) == ['ACC']
+
+
+def test_extend_matches_new_rows(df):
+    text = 'ACC > 0.5'
+    rows_filter = row_filter.RowFilter(df.iloc[:3000])
+    rows_filter.apply(row_filter.parse_filter(text, df.columns))
+    assert np.array_equal(rows_filter.extend(df), reference(df, text))
+
+
+def test_invalid_filters(df):
+    with pytest.raises(row_filter.FilterSyntaxError):
+        row_filter.parse_filter('ACC ~ 1', df.columns)
+    with pytest.raises(row_filter.UnknownColumnError):
+        row_filter.parse_filter('VEL > 1', df.columns)
+    text = pd.DataFrame({'name': ['a', 'b']})
+    with pytest.raises(row_filter.NonNumericColumnError):
+        row_filter.RowFilter(text).apply(row_filter.parse_filter('name > 1', ['name']))
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+import compact
+import csv_reader
+import session
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path.joinpath('record_UP.csv')
+    x = np.arange(500) * 0.01
+    pd.DataFrame({'time': x, 'acc': np.sin(x)}).to_csv(path, index=False)
+    return str(path)
+
+
+def save_and_load(tmp_path, csv_paths, data_pool):
+    path = tmp_path.joinpath(f'state{session.SUFFIX}')
+    state = {'import_options': {'mode': 'memory', 'compact': 0}}
+    session.save(str(path), csv_paths, data_pool, {}, state)
+    return session.load(str(path))
+
+
+@pytest.mark.parametrize('mode', ['memory', 'mmap'])
+def test_round_trip(tmp_path, csv_path, mode):
+    df = csv_reader.load_csv(csv_path, mode)
+    header, data_pool, changed = save_and_load(tmp_path, {'1': csv_path}, {'1': df})
+    tm.assert_frame_equal(data_pool['1'], pd.DataFrame(df), check_dtype=True)
+    assert changed == []
+    assert header['state']['import_options']['mode'] == 'memory'
+
+
+def test_round_trip_of_compacted_and_categorical_frames(tmp_path, csv_path):
+    df = pd.DataFrame({
+        'acc': np.linspace(0, 1, 100),
+        'channel': pd.Categorical(np.repeat(['UP', 'NS'], 50)),
+        'label': [f'row-{idx}' for idx in range(100)],
+    })
+    df, _, _ = compact.compact_dataframe(df)
+    _, data_pool, _ = save_and_load(tmp_path, {'1': csv_path}, {'1': df})
+    tm.assert_frame_equal(data_pool['1'], df)
+
+
+def test_changed_and_lazy_files_are_left_out(tmp_path, csv_path):
+    lazy_path = tmp_path.joinpath('record_NS.csv')
+    lazy_path.write_text('time,acc\n0.0,1.0\n')
+    path = tmp_path.joinpath(f'state{session.SUFFIX}')
+    csv_paths = {'1': csv_path, '2': str(lazy_path)}
+    data_pool = {'1': csv_reader.load_csv(csv_path), '2': None}
+    session.save(str(path), csv_paths, data_pool, {}, {})
+    with open(csv_path, 'a') as f:
+        f.write('5.0,0.5\n')
+    header, loaded, changed = session.load(str(path))
+    assert loaded == {}
+    assert changed == ['1']
+    assert header['frames']['2'] is None
+
+
+def test_invalid_files(tmp_path):
+    path = tmp_path.joinpath(f'broken{session.SUFFIX}')
+    path.write_bytes(b'not a session')
+    with pytest.raises(session.InvalidSessionError):
+        session.load(str(path))
+    with pytest.raises(session.InvalidSessionError):
+        session.load(str(tmp_path.joinpath('missing')))
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+import spectra
+
+
+def test_too_few_samples():
+    with pytest.raises(spectra.TooFewSamplesError):
+        spectra.amplitude_spectrum([0.0], [1.0])
+
+
+def test_constant_x():
+    with pytest.raises(spectra.NonIncreasingError):
+        spectra.response_spectrum(np.zeros(4), np.ones(4))
+
+
+def test_amplitude_of_sine():
+    x = np.arange(1000) * 0.01
+    frequencies, amplitudes = spectra.amplitude_spectrum(x, np.sin(2 * np.pi * 5 * x))
+    assert frequencies[np.argmax(amplitudes)] == pytest.approx(5.0)
+    assert amplitudes.max() == pytest.approx(1.0, rel=1e-6)
@@ -0,0 +1,56 @@
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pytest
+from matplotlib.figure import Figure
+
+import plotting
+
+
+def make_line(values_x, values_y, budget=0, method='minmax'):
+    line, = Figure().add_subplot().plot([], [])
+    return plotting.ViewportLine(line, values_x, values_y, budget, method)
+
+
+def reference_slice(values_x, xlim):
+    '''Positions inside the limits plus one neighbour on each side.'''
+    inside = np.flatnonzero((values_x >= xlim[0]) & (values_x <= xlim[1]))
+    return max(inside.min() - 1, 0), min(inside.max() + 2, len(values_x))
+
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('xlim', [(10.5, 20.5), (0, 5), (90, 200), (33, 33.5)])
+def test_visible_slice_of_monotonic_series(descending, xlim):
+    values_x = np.arange(100.0)
+    if descending:
+        values_x = values_x[::-1].copy()
+    viewport_line = make_line(values_x, np.sin(values_x))
+    visible = viewport_line.get_visible_slice(xlim)
+    start, stop = reference_slice(values_x, xlim)
+    assert visible.indices(len(values_x))[:2] == (start, stop)
+    shown = values_x[visible]
+    assert shown.min() <= max(xlim[0], 0) and shown.max() >= min(xlim[1], 99)
+
+
+def test_unsorted_series_is_not_sliced():
+    values_x = np.array([0.0, 2.0, 1.0, 3.0])
+    viewport_line = make_line(values_x, values_x)
+    assert viewport_line.get_visible_slice((0, 1)) == slice(None)
+
+
+def test_update_pushes_the_decimated_visible_part():
+    values_x = np.arange(10_000.0)
+    viewport_line = make_line(values_x, np.cos(values_x), budget=100)
+    viewport_line.update((1000, 2000), screen_points=50)
+    data_x, _ = viewport_line.line.get_data()
+    assert len(data_x) <= 52
+    assert data_x.min() >= 999 and data_x.max() <= 2001
+
+
+def test_extend_series_keeps_monotonicity():
+    values_x = np.arange(10.0)
+    viewport_line = make_line(values_x, values_x)
+    viewport_line.extend_series(np.arange(20.0), np.arange(20.0))
+    assert viewport_line.is_monotonic
+    viewport_line.extend_series(np.append(np.arange(20.0), 5.0), np.arange(21.0))
+    assert not viewport_line.is_monotonic